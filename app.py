@@ -1,10 +1,26 @@
 import streamlit as st
+import streamlit.components.v1 as components
+import altair as alt
 import pandas as pd
+import numpy as np
 import calendar
+import json
+import re
+import unicodedata
+import heapq
+from bisect import bisect_left, insort
 from datetime import date, datetime, timedelta
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+import httpx
+import random
 import time
+import threading
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
 import holidays
+from pandas.api.types import union_categoricals
+from collections import OrderedDict
 
 # ==================================================
 # 1. CONFIGURATION & CONNEXION DB
@@ -27,21 +43,286 @@ env_type = st.secrets["supabase"].get("env", "PRODUCTION")
 if env_type == "DEVELOPPEMENT":
     st.sidebar.warning("⚠️ MODE DÉVELOPPEMENT")
     st.sidebar.caption("Base : Planning-IT-DEV")
+# --- ACCÈS AUX DONNÉES (TIMEOUT, RELANCES, STATISTIQUES) ---
+# Réglages optionnels dans [supabase] de secrets.toml : timeout (s), retries, pool_size
+DB_TIMEOUT = 10
+DB_RETRIES = 3
+DB_POOL_SIZE = 10
+# Délai de la 1re relance (s), doublé à chaque tentative
+DB_BACKOFF = 0.2
+# Opérations relancées en cas d'erreur réseau (lectures seulement : une suppression
+# déjà appliquée ne renverrait plus les lignes supprimées, voir queue_delete_events)
+RETRIED_OPERATIONS = ("select",)
+
+@st.cache_resource
+def get_db_stats():
+    """Compteurs par (table, opération), communs à toutes les sessions"""
+    return {"lock": threading.Lock(), "counters": {}}
+
+def record_db_call(stats, table, op, elapsed, error=False, retried=False):
+    """Comptabilise un appel (latence en secondes), une erreur ou une relance"""
+    with stats["lock"]:
+        c = stats["counters"].setdefault((table, op), {"calls": 0, "errors": 0, "retries": 0, "total": 0.0, "max": 0.0})
+        c["calls"] += 1
+        c["errors"] += int(error)
+        c["retries"] += int(retried)
+        c["total"] += elapsed
+        c["max"] = max(c["max"], elapsed)
+
+def db_stats_frame():
+    """Statistiques d'accès à la base sous forme de tableau"""
+    stats = get_db_stats()
+    with stats["lock"]:
+        rows = [
+            {"Table": table, "Opération": op, "Appels": c["calls"], "Erreurs": c["errors"], "Relances": c["retries"],
+             "Latence moy. (ms)": round(1000 * c["total"] / c["calls"]) if c["calls"] else 0,
+             "Latence max (ms)": round(1000 * c["max"])}
+            for (table, op), c in sorted(stats["counters"].items())
+        ]
+    return pd.DataFrame(rows)
+
+def execute_query(db, table, op, query):
+    """Exécute une requête : mesure, relance avec attente exponentielle (lectures)"""
+    attempts = 1 + (db.retries if op in RETRIED_OPERATIONS else 0)
+    for attempt in range(attempts):
+        start = time.perf_counter()
+        try:
+            result = query.execute()
+        except httpx.TransportError:
+            # Erreur réseau ou délai dépassé : nouvelle tentative si l'opération le permet
+            retry = attempt + 1 < attempts
+            record_db_call(db.stats, table, op, time.perf_counter() - start, error=not retry, retried=retry)
+            if not retry:
+                raise
+            time.sleep(DB_BACKOFF * 2 ** attempt + random.uniform(0, DB_BACKOFF))
+            continue
+        except Exception:
+            record_db_call(db.stats, table, op, time.perf_counter() - start, error=True)
+            raise
+        record_db_call(db.stats, table, op, time.perf_counter() - start)
+        return result
+
+class TrackedQuery:
+    """Requête en construction : transmet les appels chaînés au client Supabase et instrumente execute()"""
+    def __init__(self, db, table, query, op=None):
+        self._db, self._table, self._query, self._op = db, table, query, op
+    
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            # Propriété renvoyant la requête (ex. not_) : toujours instrumentée
+            return TrackedQuery(self._db, self._table, attr, self._op) if hasattr(attr, "execute") else attr
+        def chained(*args, **kwargs):
+            # La première méthode appelée après table() donne l'opération (select, insert, delete...)
+            return TrackedQuery(self._db, self._table, attr(*args, **kwargs), self._op or name)
+        return chained
+    
+    def execute(self):
+        return execute_query(self._db, self._table, self._op or "select", self._query)
+
+class DataAccess:
+    """Client Supabase avec statistiques et relances ; s'utilise comme le client (supabase.table(...)...execute())
+    
+    Les compteurs sont récupérés à la création : les requêtes de la file d'écriture n'appellent pas Streamlit.
+    """
+    def __init__(self, client, retries):
+        self.client, self.retries, self.stats = client, retries, get_db_stats()
+    
+    def table(self, name):
+        return TrackedQuery(self, name, self.client.table(name))
+
 @st.cache_resource
 # ==================================================
 def init_connection():
     try:
-        url = st.secrets["supabase"]["url"]
-        key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
+        settings = st.secrets["supabase"]
+        url = settings["url"]
+        key = settings["key"]
+        # Pool HTTP commun (connexions gardées ouvertes) avec délai maximal par requête
+        pool_size = int(settings.get("pool_size", DB_POOL_SIZE))
+        http_client = httpx.Client(
+            timeout=float(settings.get("timeout", DB_TIMEOUT)),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=60),
+            follow_redirects=True,
+        )
+        client = create_client(url, key, options=ClientOptions(httpx_client=http_client))
+        return DataAccess(client, retries=int(settings.get("retries", DB_RETRIES)))
     except Exception as e:
         st.error(f"❌ Erreur connexion Supabase : {e}")
         return None
 
 supabase = init_connection()
 
+# Erreurs techniques non affichées (ex. repli sur un rechargement complet)
+logger = logging.getLogger("planning")
+
+# --- DONNÉES PARTAGÉES ENTRE SESSIONS ---
+# Un seul instantané des données par processus, lu par toutes les sessions.
+# Un instantané n'est jamais modifié : chaque écriture publie une copie
+# avec une nouvelle version (les événements sont stockés dans un tuple).
+EMPTY_SNAPSHOT = {
+    "version": 0, "apps": [], "apps_data": [], "projets": [], "projets_data": [],
+    "events": (), "events_years": frozenset(),
+    "watermarks": {"applications": None, "projets": None, "evenements": None},
+}
+
+@st.cache_resource
+def get_shared_store():
+    """Stockage commun à toutes les sessions (instantané courant + caches dérivés)"""
+    return {"lock": threading.RLock(), "snapshot": None, "stale": True,
+            "events_index": None, "events_frame": None, "events_editor": None,
+            "search_index": None, "conflicts": None,
+            "events_intervals": None, "temp_ids": itertools.count(-1, -1), "inflight_ids": set(),
+            "month_html": OrderedDict()}
+
+def publish_snapshot(store=None, **changes):
+    """Publie un nouvel instantané (précédent + changements) avec une nouvelle version"""
+    store = store or get_shared_store()
+    with store["lock"]:
+        previous = store["snapshot"] or EMPTY_SNAPSHOT
+        store["snapshot"] = {**previous, **changes, "version": previous["version"] + 1}
+        store["stale"] = False
+        return store["snapshot"]
+
+def get_snapshot():
+    """Instantané courant, (re)chargé depuis Supabase si nécessaire
+    
+    La lecture en base se fait hors du verrou : les autres sessions ne sont bloquées
+    que le temps de comparer les versions et de publier. Ne pas appeler en tenant le verrou.
+    """
+    store = get_shared_store()
+    with store["lock"]:
+        if not store["stale"]:
+            return store["snapshot"]
+        previous = store["snapshot"] or EMPTY_SNAPSHOT
+    # Années d'événements chargées : année courante au démarrage, conservées lors d'un rechargement
+    years = previous["events_years"] or frozenset({TODAY.year})
+    loaded = load_data(years)
+    with store["lock"]:
+        # Une autre session a rechargé pendant la lecture : son instantané est conservé
+        if not store["stale"] or loaded is None:
+            return store["snapshot"] or EMPTY_SNAPSHOT
+        an, af, ed, pn, pf = loaded
+        return publish_snapshot(
+            apps=an, apps_data=af, projets=pn, projets_data=pf,
+            events=tuple(ed), events_years=frozenset(years) if supabase else frozenset(),
+            watermarks={"applications": max_updated_at(af), "projets": max_updated_at(pf), "evenements": max_updated_at(ed)},
+        )
+
+def invalidate_snapshot(store=None):
+    """Force un rechargement complet de l'instantané partagé au prochain accès"""
+    store = store or get_shared_store()
+    with store["lock"]:
+        store["stale"] = True
+
+def inflight_event_ids():
+    """Ids provisoires (négatifs) des ajouts en cours d'écriture, toutes sessions confondues"""
+    store = get_shared_store()
+    with store["lock"]:
+        return frozenset(store["inflight_ids"])
+
+def patch_events(added=(), updated=None, deleted_ids=(), store=None):
+    """Applique des écritures d'événements à l'instantané partagé (copie sur écriture)
+    
+    updated : {id: événement} ; les champs fournis remplacent ceux de l'événement existant
+    store : stockage partagé déjà obtenu (file d'écriture) ; l'instantané n'est alors pas rechargé
+    """
+    updated = updated or {}
+    deleted_ids = set(deleted_ids)
+    if store is None:
+        get_snapshot()
+        store = get_shared_store()
+    with store["lock"]:
+        # Rechargement complet en attente : il relira ces écritures en base
+        if store["stale"]:
+            return
+        snap = store["snapshot"] or EMPTY_SNAPSHOT
+        kept = tuple(
+            {**ev, **updated[ev['id']]} if ev['id'] in updated else ev
+            for ev in snap["events"] if ev['id'] not in deleted_ids
+        )
+        new_snap = publish_snapshot(store, events=kept + tuple(added))
+        # La table colonnaire est corrigée de la même façon (sinon reconstruite au prochain accès)
+        cached = store["events_frame"]
+        if cached is not None and cached[0] == snap["version"]:
+            frame = patch_events_frame(cached[1], new_snap["events"], added, updated, deleted_ids)
+            store["events_frame"] = (new_snap["version"], frame)
+        # Index de recherche : seuls les événements touchés sont réindexés
+        cached = store["search_index"]
+        if cached is not None and cached[0] == snap["version"]:
+            by_id = {ev['id']: ev for ev in new_snap["events"] if ev['id'] in updated}
+            for event_id in set(deleted_ids) | set(updated):
+                search_index_remove(cached[1], event_id)
+            for ev in [*by_id.values(), *added]:
+                search_index_add(cached[1], ev)
+            store["search_index"] = (new_snap["version"], cached[1])
+
+def refresh_session():
+    """Fait pointer la session sur l'instantané partagé courant (références, sans copie)"""
+    snap = get_snapshot()
+    if st.session_state.get("data_version") == snap["version"]: return
+    st.session_state.apps, st.session_state.apps_data = snap["apps"], snap["apps_data"]
+    st.session_state.projets, st.session_state.projets_data = snap["projets"], snap["projets_data"]
+    st.session_state.events, st.session_state.events_years = snap["events"], snap["events_years"]
+    st.session_state.data_version = snap["version"]
+
 # --- FONCTIONS CRUD ---
-def load_data():
+# Nombre de lignes par page lors des lectures paginées
+PAGE_SIZE = 1000
+
+def fetch_all_pages(make_query):
+    """Exécute page par page (range) la requête construite par make_query() et retourne toutes les lignes"""
+    rows = []
+    start = 0
+    while True:
+        res = make_query().range(start, start + PAGE_SIZE - 1).execute()
+        rows.extend(res.data)
+        if len(res.data) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+def events_year_query(year, columns=None):
+    """Requête des événements qui chevauchent l'année donnée (colonnes EVENT_SELECT par défaut)"""
+    columns = columns or EVENT_SELECT
+    return (supabase.table("evenements").select(columns)
+            .gte("d2", f"{year}-01-01").lte("d1", f"{year}-12-31").order("id"))
+
+def search_tsquery(search):
+    """Requête to_tsquery de la recherche : tous les mots, chacun comme préfixe ('' si aucun mot)
+    
+    PostgreSQL coupe aussi les mots sur '_' : ces morceaux sont cherchés séparément.
+    """
+    words = [w for token in tokenize(search) for w in token.split("_") if w]
+    return " & ".join(f"{w}:*" for w in dict.fromkeys(words))
+
+def fetch_events_page(filters, page, page_size, search=""):
+    """Une page d'événements filtrés côté base (ordre des ids) ; retourne (événements, nombre total filtré)
+    
+    filters : app / env / type / projet (None = pas de filtre), no_projet = événements sans projet
+    search : mêmes mots que search_event_ids, recherchés par PostgreSQL dans la colonne
+    search (tsvector de comment / app / projet / type, voir sql/002_search.sql)
+    """
+    query = supabase.table("evenements").select(EVENT_SELECT, count="exact")
+    for col in ("app", "env", "type", "projet"):
+        if filters.get(col) is not None:
+            query = query.eq(col, filters[col])
+    if filters.get("no_projet"):
+        # Sans projet : NULL ou chaîne vide, comme events_mask
+        query = query.or_("projet.is.null,projet.eq.")
+    terms = search_tsquery(search)
+    if terms:
+        # Filtre fts écrit directement : text_search() renvoie une requête sans order() / range()
+        query = query.filter("search", "fts(simple)", terms)
+    start = page * page_size
+    res = query.order("id").range(start, start + page_size - 1).execute()
+    return [normalize_event(ev) for ev in res.data], res.count or 0
+
+def fetch_events_year(year):
+    """Charge, page par page, les événements qui chevauchent l'année donnée"""
+    return [normalize_event(ev) for ev in fetch_all_pages(lambda: events_year_query(year))]
+
+def load_data(years):
+    """Charge les applications, les projets et les événements des années demandées (None en cas d'erreur)"""
     if not supabase: return [], [], [], [], []
     try:
         # Charger les applications
@@ -54,135 +335,1380 @@ def load_data():
         projets_full = res_projets.data
         projets_names = [row['projet'] for row in projets_full]
         
-        # Charger les événements (avec leur id)
-        res_evts = supabase.table("evenements").select("*").execute()
-        evts_data = res_evts.data
-        for ev in evts_data:
-            ev['d1'] = pd.to_datetime(ev['d1']).date()
-            ev['d2'] = pd.to_datetime(ev['d2']).date()
-            if 'h1' not in ev: ev['h1'] = "00:00"
-            if 'h2' not in ev: ev['h2'] = "23:59"
-            if 'projet' not in ev: ev['projet'] = None
+        # Charger les événements des années demandées (avec leur id, sans doublon)
+        evts_by_id = {}
+        for year in sorted(years):
+            for ev in fetch_events_year(year):
+                evts_by_id.setdefault(ev['id'], ev)
+        evts_data = list(evts_by_id.values())
         return apps_names, apps_full, evts_data, projets_names, projets_full
     except Exception as e:
         st.error(f"Erreur lecture : {e}")
-        return [], [], [], [], []
-
-def save_apps_db(df_apps):
-    if not supabase: return
-    try:
-        supabase.table("applications").delete().neq("id", 0).execute()
-        data = [{"nom": str(row['Nom']).upper().strip(), "ordre": int(row['Ordre'])} for _, row in df_apps.iterrows() if row['Nom']]
-        if data: supabase.table("applications").insert(data).execute()
-    except Exception as e: st.error(f"Erreur Apps : {e}")
+        return None
 
-def save_projets_db(projet_list):
-    if not supabase: return
-    try:
-        supabase.table("projets").delete().neq("id", 0).execute()
-        if projet_list:
-            data = [{"projet": str(p).upper().strip()} for p in projet_list if p and str(p).strip()]
-            if data: supabase.table("projets").insert(data).execute()
-    except Exception as e: st.error(f"Erreur Projets : {e}")
+def ensure_events_year(year):
+    """Charge à la demande (une fois pour toutes les sessions) les événements d'une année"""
+    if not supabase or year in st.session_state.events_years: return
+    if year not in get_snapshot()["events_years"]:
+        # Lecture hors du verrou, fusion dans l'instantané le plus récent
+        try:
+            new_events = fetch_events_year(year)
+        except Exception as e:
+            st.error(f"Erreur lecture : {e}")
+            return
+        store = get_shared_store()
+        with store["lock"]:
+            snap = store["snapshot"] or EMPTY_SNAPSHOT
+            if year not in snap["events_years"]:
+                known_ids = {ev['id'] for ev in snap["events"]}
+                publish_snapshot(
+                    events=snap["events"] + tuple(ev for ev in new_events if ev['id'] not in known_ids),
+                    events_years=snap["events_years"] | {year},
+                )
+    refresh_session()
 
 # ============================================
-# FONCTIONS CRUD OPTIMISÉES POUR ÉVÉNEMENTS
+# RAFRAÎCHISSEMENT INCRÉMENTAL
 # ============================================
+# Le watermark de chaque table est le plus grand updated_at déjà vu.
+# Prérequis : colonne updated_at (timestamptz) tenue à jour par trigger sur
+# applications, projets et evenements (voir sql/001_updated_at.sql). Les suppressions
+# sont détectées en comparant les ids présents en base (requête légère sur la seule colonne id).
+# updated_at vaut l'heure de début de la transaction : une ligne validée après un
+# rafraîchissement peut porter une date antérieure au watermark. Les lignes sont donc relues
+# depuis watermark - SYNC_OVERLAP, et les ids présents en base mais absents de l'instantané
+# (ajouts manqués) sont lus par id.
+SYNC_OVERLAP = timedelta(minutes=2)
+
+def max_updated_at(rows, current=None):
+    """Plus grand updated_at parmi les lignes (ou current s'il est plus récent)"""
+    values = [row['updated_at'] for row in rows if row.get('updated_at')]
+    if current: values.append(current)
+    return max(values) if values else None
+
+def sync_since(watermark):
+    """Borne de relecture : watermark moins SYNC_OVERLAP (None sans watermark)"""
+    return (pd.Timestamp(watermark) - SYNC_OVERLAP).isoformat() if watermark else None
+
+def fetch_changed_rows(table, watermark):
+    """Lignes de la table modifiées depuis le watermark, marge comprise (toutes si pas de watermark)"""
+    since = sync_since(watermark)
+    def make_query():
+        query = supabase.table(table).select("*")
+        if since: query = query.gte("updated_at", since)
+        return query.order("id")
+    return fetch_all_pages(make_query)
+
+def fetch_changed_events(years, watermark):
+    """Événements des années chargées modifiés depuis le watermark, marge comprise (tous ceux de ces années sans watermark)"""
+    since = sync_since(watermark)
+    by_id = {}
+    for year in sorted(years):
+        def make_query(year=year):
+            query = events_year_query(year)
+            if since: query = query.gte("updated_at", since)
+            return query
+        for row in fetch_all_pages(make_query):
+            by_id.setdefault(row['id'], row)
+    return list(by_id.values())
+
+def fetch_missing_rows(table, rows, changed, live_ids, columns="*"):
+    """Lignes présentes en base (live_ids) mais ni dans l'instantané ni parmi les lignes modifiées"""
+    known = {row['id'] for row in rows} | {row['id'] for row in changed}
+    missing = sorted(row_id for row_id in live_ids if row_id not in known and row_id >= 0)
+    found = []
+    # Lecture par lots d'ids (même limite de longueur d'URL que les suppressions)
+    for start in range(0, len(missing), DELETE_CHUNK_SIZE):
+        found += supabase.table(table).select(columns).in_("id", missing[start:start + DELETE_CHUNK_SIZE]).execute().data
+    return found
+
+def merge_rows(rows, changed, live_ids):
+    """Fusionne les lignes modifiées et retire celles dont l'id n'existe plus"""
+    by_id = {row['id']: row for row in rows if row['id'] in live_ids}
+    for row in changed:
+        if row['id'] in live_ids:
+            by_id[row['id']] = row
+    return list(by_id.values())
+
+# Nouvelles tentatives quand l'instantané change pendant la lecture des changements
+SYNC_ATTEMPTS = 3
 
-def add_event_db(event):
-    """Ajoute un seul événement et retourne l'événement avec son id"""
-    if not supabase: return None
+def sync_data():
+    """Met à jour l'instantané partagé avec les seules lignes modifiées ou supprimées depuis le dernier rafraîchissement"""
+    if not supabase: return
+    for _ in range(SYNC_ATTEMPTS):
+        if sync_snapshot(get_snapshot()):
+            return
+
+def sync_snapshot(snap):
+    """Fusionne dans un nouvel instantané les changements survenus en base depuis snap
+    
+    Les lectures se font hors du verrou ; la fusion n'est publiée que si l'instantané
+    n'a pas changé entretemps (retourne False sinon, pour relancer depuis le nouvel instantané).
+    """
+    watermarks = snap["watermarks"]
     try:
-        data = {
-            "app": event['app'], 
-            "env": event['env'], 
-            "type": event['type'],
-            "d1": pd.to_datetime(event['d1']).strftime('%Y-%m-%d'),
-            "d2": pd.to_datetime(event['d2']).strftime('%Y-%m-%d'),
-            "h1": event.get('h1', '00:00'), 
-            "h2": event.get('h2', '23:59'),
-            "comment": str(event.get('comment', '')),
-            "projet": event.get('projet') if event.get('projet') else None
-        }
-        result = supabase.table("evenements").insert(data).execute()
-        if result.data:
-            new_event = result.data[0]
-            new_event['d1'] = pd.to_datetime(new_event['d1']).date()
-            new_event['d2'] = pd.to_datetime(new_event['d2']).date()
-            return new_event
-        return None
-    except Exception as e: 
-        st.error(f"Erreur ajout événement : {e}")
-        return None
+        # Applications et projets
+        changed_apps = fetch_changed_rows("applications", watermarks["applications"])
+        live_apps = {row['id'] for row in fetch_all_pages(lambda: supabase.table("applications").select("id").order("id"))}
+        changed_projets = fetch_changed_rows("projets", watermarks["projets"])
+        live_projets = {row['id'] for row in fetch_all_pages(lambda: supabase.table("projets").select("id").order("id"))}
+        changed_apps += fetch_missing_rows("applications", snap["apps_data"], changed_apps, live_apps)
+        changed_projets += fetch_missing_rows("projets", snap["projets_data"], changed_projets, live_projets)
+        
+        # Événements : seules les années chargées sont conservées
+        years = snap["events_years"]
+        changed_evts = [normalize_event(ev) for ev in fetch_changed_events(years, watermarks["evenements"])]
+        # Les événements provisoires (id négatif, écriture en cours) sont conservés
+        live_evts = set(inflight_event_ids())
+        for year in years:
+            live_evts.update(row['id'] for row in fetch_all_pages(lambda: events_year_query(year, "id")))
+        changed_evts += [normalize_event(ev) for ev in fetch_missing_rows("evenements", snap["events"], changed_evts, live_evts, EVENT_SELECT)]
+    except Exception:
+        # Pas de colonne updated_at, droits ou erreur réseau : rechargement complet (erreur journalisée)
+        logger.exception("Rafraîchissement incrémental impossible, rechargement complet")
+        invalidate_snapshot()
+        return True
+    
+    apps_full = sorted(merge_rows(snap["apps_data"], changed_apps, live_apps), key=lambda row: row['ordre'])
+    projets_full = sorted(merge_rows(snap["projets_data"], changed_projets, live_projets), key=lambda row: row['projet'])
+    store = get_shared_store()
+    with store["lock"]:
+        if store["snapshot"] is not snap:
+            return False
+        publish_snapshot(
+            apps=[row['nom'] for row in apps_full], apps_data=apps_full,
+            projets=[row['projet'] for row in projets_full], projets_data=projets_full,
+            events=tuple(merge_rows(snap["events"], changed_evts, live_evts)),
+            watermarks={
+                "applications": max_updated_at(changed_apps, watermarks["applications"]),
+                "projets": max_updated_at(changed_projets, watermarks["projets"]),
+                "evenements": max_updated_at(changed_evts, watermarks["evenements"]),
+            },
+        )
+    return True
 
-def update_event_db(event_id, event):
-    """Met à jour un événement existant par son id"""
+# --- SAUVEGARDE PAR DIFFÉRENCE (APPLICATIONS / PROJETS) ---
+# Seules les lignes modifiées sont envoyées : les lignes inchangées gardent leur id
+# et la table n'est jamais vide pour les autres sessions.
+
+def diff_rows(current, desired, key):
+    """Compare les lignes en base aux lignes voulues ; retourne (à insérer, à mettre à jour, ids à supprimer)
+    
+    Une ligne voulue est rattachée à une ligne en base par son id, sinon par la colonne key
+    (ex. une application supprimée puis ressaisie garde son id).
+    """
+    by_id = {row['id']: row for row in current}
+    by_key = {row[key]: row['id'] for row in current}
+    matched, inserts = {}, []
+    for row in desired:
+        values = {f: v for f, v in row.items() if f != 'id'}
+        row_id = row.get('id') if row.get('id') in by_id else by_key.get(row[key])
+        if row_id is None or row_id in matched:
+            inserts.append(values)
+        else:
+            matched[row_id] = values
+    
+    updates = [
+        {"id": row_id, **values} for row_id, values in matched.items()
+        if any(by_id[row_id].get(f) != v for f, v in values.items())
+    ]
+    deleted_ids = [row_id for row_id in by_id if row_id not in matched]
+    return inserts, updates, deleted_ids
+
+def apply_rows_diff(table, inserts, updates, deleted_ids):
+    """Applique une différence : suppressions (par lots d'ids), un upsert des lignes modifiées, un insert des nouvelles"""
+    for start in range(0, len(deleted_ids), DELETE_CHUNK_SIZE):
+        supabase.table(table).delete().in_("id", deleted_ids[start:start + DELETE_CHUNK_SIZE]).execute()
+    if updates: supabase.table(table).upsert(updates).execute()
+    if inserts: supabase.table(table).insert(inserts).execute()
+
+def save_apps_db(df_apps):
+    """Synchronise les applications avec l'éditeur (colonnes id, Nom, Ordre) ; retourne True si tout est passé"""
     if not supabase: return False
     try:
-        data = {
-            "app": event['app'], 
-            "env": event['env'], 
-            "type": event['type'],
-            "d1": pd.to_datetime(event['d1']).strftime('%Y-%m-%d'),
-            "d2": pd.to_datetime(event['d2']).strftime('%Y-%m-%d'),
-            "h1": event.get('h1', '00:00'), 
-            "h2": event.get('h2', '23:59'),
-            "comment": str(event.get('comment', '')),
-            "projet": event.get('projet') if event.get('projet') else None
-        }
-        supabase.table("evenements").update(data).eq("id", event_id).execute()
+        desired = [
+            {"id": None if pd.isna(app_id) else int(app_id), "nom": str(nom).upper().strip(), "ordre": int(ordre)}
+            for app_id, nom, ordre in zip(df_apps['id'], df_apps['Nom'], df_apps['Ordre']) if nom
+        ]
+        apply_rows_diff("applications", *diff_rows(get_snapshot()["apps_data"], desired, "nom"))
         return True
-    except Exception as e: 
-        st.error(f"Erreur modification événement : {e}")
+    except Exception as e:
+        st.error(f"Erreur Apps : {e}")
         return False
 
-def delete_event_db(event_id):
-    """Supprime un événement par son id"""
+def save_projets_db(projet_list):
+    """Synchronise les projets avec la liste de noms ; retourne True si tout est passé"""
     if not supabase: return False
     try:
-        supabase.table("evenements").delete().eq("id", event_id).execute()
+        desired = [{"projet": str(p).upper().strip()} for p in projet_list if p and str(p).strip()]
+        apply_rows_diff("projets", *diff_rows(get_snapshot()["projets_data"], desired, "projet"))
         return True
-    except Exception as e: 
-        st.error(f"Erreur suppression événement : {e}")
+    except Exception as e:
+        st.error(f"Erreur Projets : {e}")
         return False
 
-def delete_events_db(event_ids):
-    """Supprime plusieurs événements par leurs ids"""
-    if not supabase or not event_ids: return False
+# ============================================
+# FONCTIONS CRUD OPTIMISÉES POUR ÉVÉNEMENTS
+# ============================================
+
+def row_date(value):
+    """Date au format AAAA-MM-JJ (les objets date sont formatés directement, sans passer par pandas)"""
+    return (value if isinstance(value, date) else pd.to_datetime(value)).strftime('%Y-%m-%d')
+
+def event_to_row(event):
+    """Convertit un événement en ligne pour la table evenements"""
+    return {
+        "app": event['app'], 
+        "env": event['env'], 
+        "type": event['type'],
+        "d1": row_date(event['d1']),
+        "d2": row_date(event['d2']),
+        "h1": event.get('h1', '00:00'), 
+        "h2": event.get('h2', '23:59'),
+        "comment": str(event.get('comment', '')),
+        "projet": event.get('projet') if event.get('projet') else None
+    }
+
+def normalize_event(ev):
+    """Convertit une ligne lue en base en événement de session (dates Python + valeurs par défaut)"""
+    # Les lignes renvoyées par un ajout contiennent toutes les colonnes, dont search
+    ev.pop('search', None)
+    ev['d1'] = date.fromisoformat(str(ev['d1'])[:10])
+    ev['d2'] = date.fromisoformat(str(ev['d2'])[:10])
+    if 'h1' not in ev: ev['h1'] = "00:00"
+    if 'h2' not in ev: ev['h2'] = "23:59"
+    if 'projet' not in ev: ev['projet'] = None
+    return ev
+
+def event_changed(original, event):
+    """Indique si un événement diffère de sa version d'origine (comparaison des lignes en base)"""
+    return event_to_row(original) != event_to_row(event)
+
+def insert_events(events):
+    """Insère des événements en une seule requête et retourne les événements créés (avec id), sans toucher à l'instantané"""
+    result = supabase.table("evenements").insert([event_to_row(ev) for ev in events]).execute()
+    return [normalize_event(row) for row in (result.data or [])]
+
+def add_events_db(events, patch=True):
+    """Ajoute plusieurs événements en une seule requête et retourne les événements créés (avec id)
+    
+    patch=False : l'instantané partagé n'est pas corrigé (l'appelant l'invalide après une série d'ajouts)
+    """
+    if not supabase or not events: return []
     try:
-        for event_id in event_ids:
-            supabase.table("evenements").delete().eq("id", event_id).execute()
-        return True
+        created = insert_events(events)
+        if created and patch: patch_events(added=created)
+        return created
     except Exception as e: 
-        st.error(f"Erreur suppression événements : {e}")
-        return False
+        st.error(f"Erreur ajout événements : {e}")
+        return []
 
-# Ancienne fonction conservée pour compatibilité (mais ne devrait plus être utilisée)
-def save_events_db(event_list):
-    if not supabase: return
+# Nombre d'ids par requête DELETE (limite la longueur de l'URL)
+DELETE_CHUNK_SIZE = 200
+
+# ============================================
+# ÉCRITURES EN ARRIÈRE-PLAN (MISE À JOUR OPTIMISTE)
+# ============================================
+# Le changement est appliqué tout de suite à l'instantané partagé, puis écrit
+# dans Supabase par une file commune (un seul thread : ordre des écritures conservé).
+# En cas d'échec, le changement est annulé dans l'instantané.
+# Les événements ajoutés portent un id provisoire négatif jusqu'à confirmation :
+# ils sont suivis dans le stockage partagé, ne sont pas modifiables dans l'éditeur
+# et ne peuvent être ni modifiés ni supprimés en base.
+# Le code exécuté dans la file n'appelle pas Streamlit : le stockage partagé
+# est récupéré au moment de la mise en file, dans le thread du script.
+
+@st.cache_resource
+def get_write_executor():
+    """File d'écriture commune à toutes les sessions"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="supabase-write")
+
+def run_write(commit, rollback):
+    """Exécuté dans la file : écrit en base, annule le changement optimiste en cas d'erreur"""
     try:
-        supabase.table("evenements").delete().neq("id", 0).execute()
-        if event_list:
-            data = [{
-                "app": ev['app'], "env": ev['env'], "type": ev['type'],
-                "d1": pd.to_datetime(ev['d1']).strftime('%Y-%m-%d'),
-                "d2": pd.to_datetime(ev['d2']).strftime('%Y-%m-%d'),
-                "h1": ev.get('h1', '00:00'), "h2": ev.get('h2', '23:59'),
-                "comment": str(ev['comment']),
-                "projet": ev.get('projet') if ev.get('projet') else None
-            } for ev in event_list]
-            supabase.table("evenements").insert(data).execute()
-    except Exception as e: st.error(f"Erreur Events : {e}")
+        commit()
+    except Exception:
+        rollback()
+        raise
+
+def queue_write(label, apply, commit, rollback):
+    """Applique un changement immédiatement puis le met en file d'écriture (suivi dans la session)"""
+    apply()
+    future = get_write_executor().submit(run_write, commit, rollback)
+    st.session_state.pending_writes.append({"label": label, "future": future})
+
+def queue_add_events(events, label):
+    """Ajout optimiste d'événements ; les ids provisoires sont remplacés par ceux créés en base"""
+    store = get_shared_store()
+    provisional = [normalize_event({**ev, "id": next(store["temp_ids"])}) for ev in events]
+    temp_ids = {ev['id'] for ev in provisional}
+    def apply():
+        with store["lock"]:
+            store["inflight_ids"] |= temp_ids
+        patch_events(added=provisional)
+    def settle(**changes):
+        # Ajout confirmé ou annulé : les ids provisoires quittent l'instantané puis le suivi
+        patch_events(deleted_ids=temp_ids, store=store, **changes)
+        with store["lock"]:
+            store["inflight_ids"] -= temp_ids
+    def commit():
+        created = insert_events(events)
+        if len(created) < len(events):
+            # Ajout partiel : les lignes réellement créées sont relues en base (l'annulation est alors sans effet)
+            invalidate_snapshot(store)
+            raise RuntimeError("ajout non confirmé par la base, données rechargées")
+        settle(added=created)
+    queue_write(label, apply, commit, settle)
+
+def check_confirmed_ids(event_ids):
+    """Refuse les ids provisoires : l'événement n'existe pas encore en base"""
+    provisional = sorted(event_id for event_id in event_ids if event_id < 0)
+    if provisional:
+        raise ValueError(f"événement(s) en cours d'enregistrement : {provisional}")
+
+def queue_update_events(updates, originals, label):
+    """Modification optimiste (updates : liste de {"id", "data"}, originals : {id: événement avant modification})"""
+    check_confirmed_ids(int(u["id"]) for u in updates)
+    store = get_shared_store()
+    rows = [{"id": int(u["id"]), **event_to_row(u["data"])} for u in updates]
+    def commit():
+        supabase.table("evenements").upsert(rows).execute()
+    queue_write(label, lambda: patch_events(updated={int(u["id"]): u["data"] for u in updates}), commit,
+                lambda: patch_events(updated={int(u["id"]): originals[int(u["id"])] for u in updates}, store=store))
+
+def queue_delete_events(event_ids, originals, label):
+    """Suppression optimiste par lots ; seuls les événements non supprimés en base sont restaurés en cas d'échec"""
+    ids = [int(event_id) for event_id in event_ids]
+    check_confirmed_ids(ids)
+    store = get_shared_store()
+    deleted = set()
+    def commit():
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            chunk = ids[start:start + DELETE_CHUNK_SIZE]
+            try:
+                result = supabase.table("evenements").delete().in_("id", chunk).execute()
+            except Exception:
+                # La suppression a pu être appliquée sans réponse : les ids encore présents sont relus
+                try:
+                    remaining = {row['id'] for row in supabase.table("evenements").select("id").in_("id", chunk).execute().data}
+                    deleted.update(event_id for event_id in chunk if event_id not in remaining)
+                except Exception:
+                    # État inconnu : rechargement complet (l'annulation est alors sans effet)
+                    invalidate_snapshot(store)
+                raise
+            deleted.update(row['id'] for row in (result.data or []))
+        # Réponse sans erreur mais lignes non supprimées (droits RLS, ligne filtrée) : ces lignes sont restaurées
+        not_deleted = [event_id for event_id in ids if event_id not in deleted]
+        if not_deleted:
+            raise RuntimeError(f"{len(not_deleted)} événement(s) non supprimé(s) par la base")
+    queue_write(label, lambda: patch_events(deleted_ids=ids), commit,
+                lambda: patch_events(added=[originals[event_id] for event_id in ids if event_id not in deleted], store=store))
+
+def collect_finished_writes():
+    """Retire les écritures terminées de la session ; les échecs sont conservés pour affichage"""
+    pending = st.session_state.setdefault("pending_writes", [])
+    failed = st.session_state.setdefault("failed_writes", [])
+    finished = [w for w in pending if w["future"].done()]
+    for w in finished:
+        pending.remove(w)
+        error = w["future"].exception()
+        if error is not None:
+            failed.append(f"{w['label']} : {error}")
+    return finished
+
+@st.fragment(run_every=1)
+def pending_writes_status():
+    """Indicateur des écritures en cours ; la page est relancée dès qu'une écriture se termine"""
+    if collect_finished_writes():
+        st.rerun()
+    st.caption(f"⏳ {len(st.session_state.pending_writes)} écriture(s) en cours d'enregistrement...")
+
+# ============================================
+# STOCKAGE COLONNAIRE DES ÉVÉNEMENTS
+# ============================================
+# La ligne i de la table correspond toujours à l'événement i de l'instantané :
+# les filtres s'appliquent sur les colonnes, puis les positions retrouvent les événements.
+EVENT_COLUMNS = ["id", "app", "env", "type", "projet", "d1", "d2", "h1", "h2", "comment"]
+# Colonnes lues en base : la colonne de recherche search (tsvector) n'est jamais relue
+EVENT_SELECT = ",".join([*EVENT_COLUMNS, "updated_at"])
+CATEGORY_COLUMNS = ["app", "env", "type", "projet"]
+
+def build_events_frame(events):
+    """Table des événements : catégories pour app/env/type/projet, datetime64 pour d1/d2"""
+    frame = pd.DataFrame(list(events), columns=EVENT_COLUMNS)
+    for col in CATEGORY_COLUMNS:
+        frame[col] = frame[col].astype("category")
+    frame["d1"] = pd.to_datetime(frame["d1"])
+    frame["d2"] = pd.to_datetime(frame["d2"])
+    return frame
+
+def concat_events_frames(frame, other):
+    """Concatène deux tables en conservant les colonnes catégorielles"""
+    return pd.DataFrame({
+        col: union_categoricals([frame[col].array, other[col].array]) if col in CATEGORY_COLUMNS
+        else np.concatenate([frame[col].to_numpy(), other[col].to_numpy()])
+        for col in EVENT_COLUMNS
+    })
+
+def patch_events_frame(frame, events, added, updated, deleted_ids):
+    """Applique ajouts, modifications et suppressions sans reconstruire toute la table
+    
+    events : événements du nouvel instantané (pour relire les lignes modifiées)
+    """
+    if deleted_ids:
+        frame = frame[~frame["id"].isin(list(deleted_ids))].reset_index(drop=True)
+    if updated:
+        frame = frame.copy()
+        positions = np.flatnonzero(frame["id"].isin(list(updated)).to_numpy())
+        changed = build_events_frame([events[pos] for pos in positions])
+        for col in EVENT_COLUMNS:
+            values = changed[col]
+            if col in CATEGORY_COLUMNS:
+                new_categories = values.cat.categories.difference(frame[col].cat.categories)
+                if len(new_categories):
+                    frame[col] = frame[col].cat.add_categories(new_categories)
+                values = values.astype(object)
+            frame.iloc[positions, frame.columns.get_loc(col)] = values.to_numpy()
+    if added:
+        frame = concat_events_frames(frame, build_events_frame(added))
+    return frame
+
+def get_events_frame(snap=None):
+    """Table colonnaire d'un instantané (le courant par défaut) et ses événements (mêmes positions)"""
+    snap = snap or get_snapshot()
+    store = get_shared_store()
+    with store["lock"]:
+        cached = store["events_frame"]
+        if cached is None or cached[0] != snap["version"]:
+            cached = (snap["version"], build_events_frame(snap["events"]))
+            store["events_frame"] = cached
+        return cached[1], snap["events"]
+
+def get_events_editor_frame():
+    """Version éditable de la table (valeurs Python, dates sans heure), construite une fois par instantané"""
+    snap = get_snapshot()
+    version = snap["version"]
+    store = get_shared_store()
+    with store["lock"]:
+        frame, events = get_events_frame(snap)
+        cached = store["events_editor"]
+        if cached is None or cached[0] != version:
+            cached = (version, editor_frame(frame))
+            store["events_editor"] = cached
+        return frame, cached[1]
+
+def editor_frame(frame):
+    """Copie d'une table colonnaire pour st.data_editor (objets Python, None si vide, dates sans heure)"""
+    editor = frame.copy()
+    for col in CATEGORY_COLUMNS:
+        editor[col] = editor[col].astype(object).where(editor[col].notna(), None)
+    editor["d1"] = editor["d1"].dt.date
+    editor["d2"] = editor["d2"].dt.date
+    return editor
+
+def events_mask(frame, app=None, env=None, type=None, projet=None, no_projet=False):
+    """Masque booléen des lignes correspondant aux filtres fournis"""
+    mask = np.ones(len(frame), dtype=bool)
+    if app is not None: mask &= (frame["app"] == app).to_numpy()
+    if env is not None: mask &= (frame["env"] == env).to_numpy()
+    if type is not None: mask &= (frame["type"] == type).to_numpy()
+    if projet is not None: mask &= (frame["projet"] == projet).to_numpy()
+    if no_projet: mask &= (frame["projet"].isna() | (frame["projet"] == "")).to_numpy()
+    return mask
+
+# ============================================
+# INDEX DES ÉVÉNEMENTS (PLANNING)
+# ============================================
+
+def build_events_index(frame):
+    """Regroupe les positions des événements par (env, app), triées par date de début"""
+    d1 = frame["d1"].to_numpy()
+    d2 = frame["d2"].to_numpy()
+    index = {}
+    for key, positions in frame.groupby(["env", "app"], observed=True).indices.items():
+        order = np.argsort(d1[positions], kind="stable")
+        positions = positions[order]
+        index[key] = (d1[positions], d2[positions], positions)
+    return index
+
+def get_events_in_range(index, events, env, app, start, end):
+    """Retourne les événements (env, app) qui chevauchent [start, end], dans leur ordre d'origine"""
+    if (env, app) not in index: return []
+    starts, ends, positions = index[(env, app)]
+    # Seuls les événements commençant avant la fin de la période peuvent la chevaucher
+    stop = np.searchsorted(starts, np.datetime64(end, "ns"), side="right")
+    hits = positions[:stop][ends[:stop] >= np.datetime64(start, "ns")]
+    return [events[pos] for pos in np.sort(hits)]
+
+def row_runs(row_events, n_days, start):
+    """Cellules d'une ligne en mode barres : [début, fin exclusive, événements] par suite de jours
+    
+    Une cellule (colspan) par suite de jours ayant le même ensemble d'événements ; les bornes
+    viennent des événements eux-mêmes (jours comptés depuis start, n_days jours affichés).
+    """
+    bounds = [
+        (max((ev["d1"] - start).days, 0), min((ev["d2"] - start).days, n_days - 1) + 1)
+        for ev in row_events
+    ]
+    cuts = sorted({0, n_days, *(a for a, _ in bounds), *(b for _, b in bounds)})
+    runs = []
+    for a, b in zip(cuts, cuts[1:]):
+        evs = [ev for ev, (s, e) in zip(row_events, bounds) if s <= a and b <= e]
+        if runs and not evs and not runs[-1][2]:
+            runs[-1][1] = b
+        else:
+            runs.append([a, b, evs])
+    return runs
+
+def get_events_index():
+    """Index des événements (et événements associés), partagé entre sessions et reconstruit seulement quand l'instantané change"""
+    snap = get_snapshot()
+    version = snap["version"]
+    store = get_shared_store()
+    with store["lock"]:
+        frame, events = get_events_frame(snap)
+        cached = store["events_index"]
+        if cached is None or cached[0] != version:
+            cached = (version, build_events_index(frame), events)
+            store["events_index"] = cached
+        return cached[1], cached[2]
+
+# ============================================
+# RECHERCHE (INDEX INVERSÉ)
+# ============================================
+# Mots (minuscules, sans accents) de comment / app / projet / type -> ids des événements.
+# Le vocabulaire trié permet la recherche par préfixe (saisie en cours, numéros de ticket).
+
+SEARCH_FIELDS = ("comment", "app", "projet", "type")
+
+def tokenize(text):
+    """Mots d'un texte, en minuscules et sans accents"""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return re.findall(r"\w+", "".join(c for c in text if not unicodedata.combining(c)))
+
+def event_tokens(ev):
+    """Ensemble des mots indexés d'un événement"""
+    return {token for field in SEARCH_FIELDS if ev.get(field) for token in tokenize(ev[field])}
+
+def search_index_add(index, ev):
+    """Ajoute un événement à l'index"""
+    tokens = event_tokens(ev)
+    index["tokens"][ev['id']] = tokens
+    for token in tokens:
+        ids = index["postings"].get(token)
+        if ids is None:
+            ids = index["postings"][token] = set()
+            insort(index["vocab"], token)
+        ids.add(ev['id'])
+
+def search_index_remove(index, event_id):
+    """Retire un événement de l'index (les mots devenus inutilisés quittent le vocabulaire)"""
+    for token in index["tokens"].pop(event_id, ()):
+        ids = index["postings"][token]
+        ids.discard(event_id)
+        if not ids:
+            del index["postings"][token]
+            del index["vocab"][bisect_left(index["vocab"], token)]
+
+def build_search_index(events):
+    """Index inversé des événements : {"postings": mot -> ids, "tokens": id -> mots, "vocab": mots triés}"""
+    index = {"postings": {}, "tokens": {}, "vocab": []}
+    for ev in events:
+        tokens = event_tokens(ev)
+        index["tokens"][ev['id']] = tokens
+        for token in tokens:
+            index["postings"].setdefault(token, set()).add(ev['id'])
+    index["vocab"] = sorted(index["postings"])
+    return index
+
+def search_event_ids(query):
+    """Ids des événements contenant tous les mots de la recherche (chaque mot comme préfixe)"""
+    snap = get_snapshot()
+    version = snap["version"]
+    store = get_shared_store()
+    with store["lock"]:
+        cached = store["search_index"]
+        if cached is None or cached[0] != version:
+            cached = (version, build_search_index(snap["events"]))
+            store["search_index"] = cached
+        index = cached[1]
+        result = None
+        for word in set(tokenize(query)):
+            vocab = index["vocab"]
+            matches = set()
+            pos = bisect_left(vocab, word)
+            while pos < len(vocab) and vocab[pos].startswith(word):
+                matches |= index["postings"][vocab[pos]]
+                pos += 1
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result if result is not None else set()
+
+# ============================================
+# DÉTECTION DES CONFLITS (CHEVAUCHEMENTS)
+# ============================================
+# Deux événements d'une même application et d'un même environnement sont en conflit
+# quand leurs créneaux (d1 h1 -> d2 h2) se chevauchent et que leurs types sont incompatibles.
+# Balayage par (app, env) dans l'ordre des débuts : seuls les créneaux encore ouverts sont comparés.
+
+# Paires de classes de type incompatibles (voir get_event_class)
+CONFLICT_RULES = {
+    frozenset({"mep", "mor"}),  # MEP pendant un moratoire
+    frozenset({"mep", "mai"}),  # MEP pendant une maintenance
+    frozenset({"mep"}),         # deux MEP simultanées
+    frozenset({"mai"}),         # deux maintenances simultanées
+}
+
+def hour_minutes(h, default):
+    """Minutes depuis minuit d'une heure HH:MM (default si illisible ou hors de 00:00-23:59)"""
+    try:
+        hours, minutes = (int(part) for part in str(h).split(":"))
+    except ValueError:
+        return default
+    return hours * 60 + minutes if 0 <= hours < 24 and 0 <= minutes < 60 else default
+
+def event_interval(ev):
+    """Créneau d'un événement en minutes [début, fin[ (la minute de fin h2 est incluse)"""
+    d1 = ev['d1'] if isinstance(ev['d1'], date) else pd.Timestamp(ev['d1'])
+    d2 = ev['d2'] if isinstance(ev['d2'], date) else pd.Timestamp(ev['d2'])
+    start = d1.toordinal() * 1440 + hour_minutes(ev.get('h1'), 0)
+    end = d2.toordinal() * 1440 + hour_minutes(ev.get('h2'), 1439) + 1
+    return start, max(end, start + 1)
+
+def sweep_conflicts(items):
+    """Paires (événement, événement) en conflit
+    
+    items : liste de (événement, candidat) ; seules les paires impliquant au moins un candidat sont retenues
+    """
+    groups = {}
+    for ev, candidate in items:
+        start, end = event_interval(ev)
+        groups.setdefault((ev['app'], ev['env']), []).append((start, end, candidate, get_event_class(ev['type']), ev))
+    pairs = []
+    for group in groups.values():
+        group.sort(key=lambda item: item[0])
+        # Créneaux ouverts, triés par fin (tas)
+        active = []
+        for i, (start, end, candidate, cls, ev) in enumerate(group):
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _, _, other_candidate, other_cls, other in active:
+                if (candidate or other_candidate) and frozenset((cls, other_cls)) in CONFLICT_RULES:
+                    pairs.append((other, ev))
+            heapq.heappush(active, (end, i, candidate, cls, ev))
+    return pairs
+
+def find_conflicts(candidates, existing):
+    """Conflits des événements candidats entre eux et avec les événements existants"""
+    keys = {(ev['app'], ev['env']) for ev in candidates}
+    items = [(ev, False) for ev in existing if (ev['app'], ev['env']) in keys]
+    return sweep_conflicts(items + [(ev, True) for ev in candidates])
+
+def get_conflict_ids():
+    """Ids des événements en conflit dans l'instantané courant (calculés une fois par version)"""
+    snap = get_snapshot()
+    store = get_shared_store()
+    with store["lock"]:
+        cached = store["conflicts"]
+        if cached is None or cached[0] != snap["version"]:
+            pairs = sweep_conflicts([(ev, True) for ev in snap["events"]])
+            cached = (snap["version"], {ev['id'] for pair in pairs for ev in pair})
+            store["conflicts"] = cached
+        return cached[1]
+
+def conflict_label(a, b):
+    """Description d'un conflit pour les avertissements"""
+    def slot(ev):
+        return (f"{ev['type']} du {pd.Timestamp(ev['d1']).strftime('%d/%m')} {ev.get('h1', '00:00')}"
+                f" au {pd.Timestamp(ev['d2']).strftime('%d/%m')} {ev.get('h2', '23:59')}")
+    return f"{a['app']} / {a['env']} : {slot(a)} ↔ {slot(b)}"
+
+def report_conflicts(pairs):
+    """Conserve les conflits détectés pour affichage dans la barre latérale (après rerun)"""
+    st.session_state.conflict_warnings = [conflict_label(a, b) for a, b in pairs]
+    if pairs:
+        st.toast(f"⚠️ {len(pairs)} conflit(s) de planning détecté(s)")
+
+# ============================================
+# CACHE HTML DU PLANNING
+# ============================================
+# Cache commun à toutes les sessions (la clé contient la version de l'instantané) :
+# quelques combinaisons d'environnement / filtre pour les 12 mois
+MONTH_HTML_CACHE_SIZE = 96
+
+def get_month_html(key, render):
+    """Retourne le HTML d'un mois depuis le cache LRU partagé, ou le construit via render() (hors du verrou)"""
+    store = get_shared_store()
+    with store["lock"]:
+        cache = store["month_html"]
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    html = render()
+    with store["lock"]:
+        cache[key] = html
+        cache.move_to_end(key)
+        while len(cache) > MONTH_HTML_CACHE_SIZE:
+            cache.popitem(last=False)
+    return html
+
+# ============================================
+# VALIDATION DES ÉDITEURS (OPÉRATIONS SUR COLONNES)
+# ============================================
+# Heure attendue : 5 caractères avec ':' en 3e position (HH:MM)
+HOUR_PATTERN = r"(?s)^.{2}:.{2}$"
+
+def filled_text(series):
+    """Textes d'une colonne d'éditeur sans espaces superflus ("" pour les cellules vides)"""
+    return series.astype(object).where(series.notna(), "").astype(str).str.strip()
+
+def line_errors(index, checks):
+    """Messages « Ligne N » : pour chaque ligne, seule la première vérification en échec est retenue
+    
+    checks : liste de (masque des lignes en échec, message ou Series de messages)
+    """
+    messages = pd.Series(None, index=index, dtype=object)
+    for failed, message in reversed(checks):
+        messages = messages.mask(failed, message)
+    return [f"⚠️ Ligne {idx + 1}: {message}" for idx, message in messages.dropna().items()], messages.isna()
+
+def validate_apps(df):
+    """Valide l'éditeur des applications ; retourne (erreurs, DataFrame id/Nom/Ordre des lignes valides)"""
+    noms = filled_text(df["Nom"])
+    rows = df[noms != ""]
+    errors, ok = line_errors(rows.index, [
+        (rows["Ordre"].isna(), "L'ordre est obligatoire pour '" + noms[rows.index] + "'"),
+    ])
+    valid = rows[ok]
+    return errors, pd.DataFrame({"id": valid["id"], "Nom": noms[valid.index].str.upper(), "Ordre": valid["Ordre"].astype(int)})
+
+def validate_projets(df):
+    """Noms de projets saisis (majuscules, sans espaces superflus)"""
+    noms = filled_text(df["Projet"])
+    return noms[noms != ""].str.upper().tolist()
+
+def validate_events(df):
+    """Valide l'éditeur des événements ; retourne (erreurs, [(id, événement)] des lignes valides)
+    
+    Seules les lignes avec une application sont prises en compte. Date de fin par défaut = date de début,
+    heures par défaut 00:00 / 23:59.
+    """
+    rows = df[df["app"].notna()]
+    d1 = rows["d1"]
+    d2 = rows["d2"].where(rows["d2"].notna(), d1)
+    h1 = filled_text(rows["h1"]).where(rows["h1"].notna(), "00:00")
+    h2 = filled_text(rows["h2"]).where(rows["h2"].notna(), "23:59")
+    errors, ok = line_errors(rows.index, [
+        (rows["env"].isna(), "Environnement obligatoire"),
+        (rows["type"].isna(), "Type obligatoire"),
+        (d1.isna(), "Date début obligatoire"),
+        (pd.to_datetime(d2) < pd.to_datetime(d1), "Date fin avant date début"),
+        (~h1.str.match(HOUR_PATTERN), "Format heure début invalide (attendu HH:MM)"),
+        (~h2.str.match(HOUR_PATTERN), "Format heure fin invalide (attendu HH:MM)"),
+    ])
+    valid = rows[ok]
+    projet = valid["projet"].astype(object)
+    events = pd.DataFrame({
+        "app": valid["app"],
+        "env": valid["env"],
+        "type": valid["type"],
+        "d1": valid["d1"],
+        "d2": d2[ok],
+        "h1": h1[ok],
+        "h2": h2[ok],
+        "comment": valid["comment"].astype(str).str.strip(),
+        "projet": projet.where(projet.notna() & (projet != ""), None),
+    }).to_dict("records")
+    return errors, list(zip(valid["id"].tolist(), events))
+
+# ============================================
+# IMPORT DE FICHIERS (CSV / XLSX PAR MORCEAUX)
+# ============================================
+# Le fichier est lu par morceaux de IMPORT_CHUNK_SIZE lignes : chaque morceau est résolu
+# (noms connus), validé comme l'éditeur des événements puis inséré par lots, et n'est pas conservé.
+# Les lots sont écrits directement (hors de la file d'écriture, l'import attend chaque lot) ;
+# l'instantané partagé est invalidé une seule fois, en fin d'import.
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_BATCH_SIZE = 1000
+# Nombre de messages d'erreur conservés pour affichage (les suivants sont seulement comptés)
+IMPORT_MAX_ERRORS = 200
+
+IMPORT_COLUMNS = ["app", "env", "type", "d1", "d2", "h1", "h2", "comment", "projet"]
+IMPORT_COLUMN_ALIASES = {
+    "application": "app", "environnement": "env", "date debut": "d1", "debut": "d1",
+    "date fin": "d2", "fin": "d2", "heure debut": "h1", "heure fin": "h2", "commentaire": "comment",
+}
+IMPORT_ENVS = ["PROD", "PRÉPROD", "RECETTE"]
+IMPORT_TYPES = ["MEP", "INCIDENT", "MAINTENANCE", "TEST", "TNR", "MORATOIRE"]
+
+def name_key(text):
+    """Clé de comparaison d'un nom (sans casse, accents ni ponctuation)"""
+    return " ".join(tokenize(text))
+
+def read_csv_chunks(file, chunk_size):
+    """Morceaux d'un CSV (séparateur ; ou , détecté sur l'en-tête) et avancement dans le fichier"""
+    header = file.readline().decode("utf-8-sig", errors="ignore")
+    file.seek(0)
+    sep = ";" if header.count(";") > header.count(",") else ","
+    size = max(file.size, 1)
+    # Lignes vides conservées (ignorées ensuite) pour garder les numéros de ligne du fichier
+    for chunk in pd.read_csv(file, sep=sep, dtype=str, chunksize=chunk_size, encoding="utf-8-sig",
+                             skipinitialspace=True, skip_blank_lines=False):
+        yield chunk, min(file.tell() / size, 1.0)
+
+def read_xlsx_chunks(file, chunk_size):
+    """Morceaux de la première feuille d'un classeur Excel (lecture en flux, openpyxl read_only)"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(col) if col is not None else "" for col in next(rows, ())]
+        total = max((sheet.max_row or 1) - 1, 1)
+        buffer, done = [], 0
+        for row in rows:
+            # Lignes complétées / tronquées à la largeur de l'en-tête
+            buffer.append((tuple(row) + (None,) * len(header))[:len(header)])
+            if len(buffer) == chunk_size:
+                done += len(buffer)
+                yield pd.DataFrame(buffer, columns=header), min(done / total, 1.0)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header), 1.0
+    finally:
+        workbook.close()
+
+def import_dates(values):
+    """Dates d'une colonne importée (AAAA-MM-JJ, JJ/MM/AAAA ou cellule date Excel) ; NaT si illisible"""
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    parsed = parsed.fillna(pd.to_datetime(values.where(parsed.isna()), errors="coerce", format="%d/%m/%Y"))
+    return parsed.dt.date
+
+def import_hours(values):
+    """Heures d'une colonne importée (les cellules heure Excel deviennent HH:MM)"""
+    return values.map(lambda v: v.strftime("%H:%M") if hasattr(v, "strftime") else v)
+
+def prepare_import_chunk(chunk, first_line, apps, projets):
+    """Résout et valide un morceau ; retourne (erreurs, [événements valides])
+    
+    first_line : numéro de ligne du fichier de la 1re ligne du morceau (en-tête = ligne 1)
+    """
+    chunk = chunk.rename(columns=lambda col: IMPORT_COLUMN_ALIASES.get(name_key(col), name_key(col).replace(" ", "")))
+    chunk = chunk.reindex(columns=IMPORT_COLUMNS).astype(object)
+    chunk = chunk.where(chunk.notna(), None)
+    # Numéros de ligne du fichier (« Ligne N » des messages = index + 1)
+    chunk.index = pd.RangeIndex(first_line - 1, first_line - 1 + len(chunk))
+    # Lignes entièrement vides ignorées
+    chunk = chunk[(chunk.apply(filled_text) != "").any(axis=1)]
+    
+    raw = {col: filled_text(chunk[col]) for col in ["app", "env", "type", "projet", "d1", "d2"]}
+    resolved = {}
+    for col, names in [("app", apps), ("env", IMPORT_ENVS), ("type", IMPORT_TYPES), ("projet", projets)]:
+        # Chaque valeur distincte n'est résolue qu'une fois
+        lookup = {name_key(name): name for name in names}
+        resolved[col] = raw[col].map({text: lookup.get(name_key(text)) for text in raw[col].unique() if text})
+    d1, d2 = import_dates(chunk["d1"]), import_dates(chunk["d2"])
+    
+    errors, ok = line_errors(chunk.index, [
+        (raw["app"] == "", "Application obligatoire"),
+        (resolved["app"].isna() & (raw["app"] != ""), "Application inconnue : '" + raw["app"] + "'"),
+        (resolved["env"].isna() & (raw["env"] != ""), "Environnement inconnu : '" + raw["env"] + "'"),
+        (resolved["type"].isna() & (raw["type"] != ""), "Type inconnu : '" + raw["type"] + "'"),
+        (resolved["projet"].isna() & (raw["projet"] != ""), "Projet inconnu : '" + raw["projet"] + "'"),
+        (d1.isna() & (raw["d1"] != ""), "Date début illisible (attendu AAAA-MM-JJ ou JJ/MM/AAAA)"),
+        (d2.isna() & (raw["d2"] != ""), "Date fin illisible (attendu AAAA-MM-JJ ou JJ/MM/AAAA)"),
+    ])
+    
+    # Mêmes règles que la sauvegarde de l'éditeur des événements
+    df = pd.DataFrame({
+        "id": None, **{col: resolved[col] for col in ["app", "env", "type"]},
+        "d1": d1, "d2": d2, "h1": import_hours(chunk["h1"]), "h2": import_hours(chunk["h2"]),
+        "comment": filled_text(chunk["comment"]), "projet": resolved["projet"],
+    })[ok]
+    validation_errors, valid_events = validate_events(df)
+    errors = sorted(errors + validation_errors, key=lambda message: int(re.search(r"Ligne (\d+)", message).group(1)))
+    return errors, [event for _, event in valid_events]
+
+def import_events_file(file, apps, projets, dry_run=False, on_progress=None):
+    """Importe (ou vérifie seulement si dry_run) un fichier CSV / XLSX d'événements, morceau par morceau
+    
+    Les lignes en erreur sont ignorées ; on_progress(avancement 0-1, stats) est appelé après chaque morceau.
+    """
+    stats = {"rows": 0, "valid": 0, "imported": 0, "error_count": 0, "errors": [], "failed": False}
+    reader = read_xlsx_chunks if file.name.lower().endswith(".xlsx") else read_csv_chunks
+    # Ligne du fichier de la 1re ligne du morceau suivant (en-tête = ligne 1)
+    line = 2
+    try:
+        for chunk, progress in reader(file, IMPORT_CHUNK_SIZE):
+            errors, events = prepare_import_chunk(chunk, line, apps, projets)
+            line += len(chunk)
+            stats["rows"] += int(chunk.notna().any(axis=1).sum())
+            stats["valid"] += len(events)
+            stats["error_count"] += len(errors)
+            stats["errors"].extend(errors[:IMPORT_MAX_ERRORS - len(stats["errors"])])
+            if not dry_run:
+                for start in range(0, len(events), IMPORT_BATCH_SIZE):
+                    batch = events[start:start + IMPORT_BATCH_SIZE]
+                    created = add_events_db(batch, patch=False)
+                    stats["imported"] += len(created)
+                    if len(created) < len(batch):
+                        # Erreur d'écriture (affichée par add_events_db) : import interrompu
+                        stats["failed"] = True
+                        return stats
+            if on_progress:
+                on_progress(progress, stats)
+    finally:
+        # Instantané relu en base au prochain accès (événements importés, toutes années)
+        if stats["imported"]:
+            invalidate_snapshot()
+    return stats
+
+# ============================================
+# CALENDRIER (JOURS OUVRÉS ET FÉRIÉS)
+# ============================================
+
+@st.cache_resource
+def get_year_calendar(year):
+    """Calendrier précalculé d'une année (partagé, lecture seule), un élément par jour :
+    jour de semaine, week-end, nom du férié (ou None), jour ouvré,
+    plus la somme cumulée des jours ouvrés pour compter en temps constant
+    """
+    first = date(year, 1, 1)
+    dates = [first + timedelta(days=i) for i in range(366 if calendar.isleap(year) else 365)]
+    fr_holidays = holidays.France(years=year)
+    weekday = np.array([d.weekday() for d in dates], dtype=np.int8)
+    holiday_name = [fr_holidays.get(d) for d in dates]
+    weekend = weekday >= 5
+    working = ~weekend & np.array([name is None for name in holiday_name])
+    return {
+        "first": first,
+        "weekday": weekday,
+        "weekend": weekend,
+        "holiday_name": holiday_name,
+        "working": working,
+        "working_cumsum": np.concatenate(([0], np.cumsum(working))),
+    }
+
+def day_index(year_cal, d):
+    """Position d'une date dans le calendrier de son année"""
+    return (d - year_cal["first"]).days
+
+def working_days_between(year_cal, d1, d2):
+    """Nombre de jours ouvrés entre d1 et d2 inclus (dates de la même année)"""
+    cumsum = year_cal["working_cumsum"]
+    return int(cumsum[day_index(year_cal, d2) + 1] - cumsum[day_index(year_cal, d1)])
+
+# ============================================
+# CALCUL DE DISPONIBILITÉ (DASHBOARD)
+# ============================================
+
+def compute_availability(apps, ev_apps, ev_d1, ev_d2, period_start, working_mask):
+    """Calcule la disponibilité de toutes les applications en une fois
+    
+    working_mask : tableau booléen des jours ouvrés, un élément par jour à partir de period_start
+    ev_apps, ev_d1, ev_d2 : colonnes des événements rendant l'application indisponible (déjà filtrés)
+    """
+    n_days = len(working_mask)
+    total_working_days = int(working_mask.sum())
+    app_index = pd.Index(list(dict.fromkeys(apps)))
+    
+    # Bornes de chaque événement en indices de jour, limitées à la période
+    origin = np.datetime64(period_start, "D")
+    ev_rows = app_index.get_indexer(ev_apps)
+    ev_starts = np.maximum((ev_d1.astype("datetime64[D]") - origin).astype(np.int64), 0)
+    ev_ends = np.minimum((ev_d2.astype("datetime64[D]") - origin).astype(np.int64), n_days - 1)
+    keep = (ev_rows >= 0) & (ev_starts <= ev_ends)
+    
+    # Chaque événement = +1 au début, -1 après la fin ; la somme cumulée donne l'occupation par jour
+    diff = np.zeros((len(app_index), n_days + 1), dtype=np.int32)
+    np.add.at(diff, (ev_rows[keep], ev_starts[keep]), 1)
+    np.add.at(diff, (ev_rows[keep], ev_ends[keep] + 1), -1)
+    occupied = np.cumsum(diff[:, :n_days], axis=1) > 0
+    unavailable = (occupied & working_mask).sum(axis=1).tolist()
+    
+    results = []
+    for app_name in apps:
+        nb_unavailable = unavailable[app_index.get_loc(app_name)]
+        nb_available = total_working_days - nb_unavailable
+        availability = (nb_available / total_working_days) * 100 if total_working_days > 0 else 100
+        results.append({
+            "app": app_name,
+            "total": total_working_days,
+            "unavailable": nb_unavailable,
+            "available": nb_available,
+            "availability": availability
+        })
+    return results
+
+# ============================================
+# CRÉNEAUX HORAIRES (DISPONIBILITÉ À LA MINUTE)
+# ============================================
+# Les heures h1 / h2 ("HH:MM") sont converties une fois par table colonnaire en créneaux
+# datetime64[m] [début, fin[ ; la minute de fin h2 est incluse, comme pour les conflits.
+
+# Plage ouvrée des jours ouvrés (minutes depuis minuit) pour le mode horaire du dashboard
+BUSINESS_HOURS = (8 * 60, 18 * 60)
+
+def hour_minutes_column(values, default):
+    """Minutes depuis minuit d'une colonne d'heures HH:MM (default si illisible ou hors de 00:00-23:59, comme hour_minutes)"""
+    parts = pd.Series(values, dtype=object).astype(str).str.extract(r"^\s*(\d+)\s*:\s*(\d+)\s*$")
+    hours, minutes = pd.to_numeric(parts[0]), pd.to_numeric(parts[1])
+    valid = hours.between(0, 23) & minutes.between(0, 59)
+    return (hours * 60 + minutes).where(valid).fillna(default).to_numpy(dtype=np.int64)
+
+def build_events_intervals(frame):
+    """Créneaux (début, fin exclusive) de chaque ligne de la table, en datetime64[m]"""
+    starts = frame["d1"].to_numpy().astype("datetime64[m]") + hour_minutes_column(frame["h1"], 0).astype("timedelta64[m]")
+    ends = frame["d2"].to_numpy().astype("datetime64[m]") + (hour_minutes_column(frame["h2"], 1439) + 1).astype("timedelta64[m]")
+    return starts, np.maximum(ends, starts + np.timedelta64(1, "m"))
+
+def get_events_intervals(frame):
+    """Créneaux des événements d'une table colonnaire (mêmes positions), calculés une fois par table"""
+    store = get_shared_store()
+    with store["lock"]:
+        cached = store["events_intervals"]
+        if cached is None or cached[0] is not frame:
+            cached = (frame, *build_events_intervals(frame))
+            store["events_intervals"] = cached
+        return cached[1], cached[2]
+
+def compute_availability_hours(apps, ev_apps, ev_starts, ev_ends, period_start, working_mask, business_hours=BUSINESS_HOURS):
+    """Disponibilité de toutes les applications en heures ouvrées (plage business_hours des jours ouvrés)
+    
+    Mêmes champs que compute_availability, mais le total ne compte que les heures de la plage
+    et un événement n'est indisponible que sur la partie de ses créneaux qui la recoupe.
+    ev_starts, ev_ends : créneaux datetime64[m] des événements (déjà filtrés)
+    """
+    n_days = len(working_mask)
+    open_min, close_min = business_hours
+    width = close_min - open_min
+    app_index = pd.Index(list(dict.fromkeys(apps)))
+    
+    # Minutes ouvrées écoulées depuis le début de la période jusqu'à l'instant t (en minutes)
+    cumsum = np.concatenate(([0], np.cumsum(working_mask)))
+    working = np.append(working_mask, False)
+    def business_before(t):
+        day, minute = t // 1440, t % 1440
+        return cumsum[day] * width + working[day] * np.clip(minute - open_min, 0, width)
+    
+    # Créneaux en minutes depuis le début de la période, limités à la période
+    origin = np.datetime64(period_start, "m")
+    rows = app_index.get_indexer(ev_apps)
+    starts = np.clip((ev_starts - origin).astype(np.int64), 0, n_days * 1440)
+    ends = np.clip((ev_ends - origin).astype(np.int64), 0, n_days * 1440)
+    keep = (rows >= 0) & (starts < ends)
+    rows, starts, ends = rows[keep], starts[keep], ends[keep]
+    
+    # Union des créneaux de chaque application : un bloc commence quand un créneau débute
+    # après la fin de tous les précédents (de la même application)
+    unavailable_min = np.zeros(len(app_index))
+    if len(rows):
+        order = np.lexsort((starts, rows))
+        rows, starts, ends = rows[order], starts[order], ends[order]
+        reach = pd.Series(ends).groupby(rows).cummax().to_numpy()
+        new_block = np.ones(len(rows), dtype=bool)
+        new_block[1:] = (rows[1:] != rows[:-1]) | (starts[1:] > reach[:-1])
+        first = np.flatnonzero(new_block)
+        minutes = business_before(np.maximum.reduceat(ends, first)) - business_before(starts[first])
+        unavailable_min = np.bincount(rows[first], weights=minutes, minlength=len(app_index))
+    
+    total_hours = int(working_mask.sum()) * width / 60
+    results = []
+    for app_name in apps:
+        nb_unavailable = unavailable_min[app_index.get_loc(app_name)] / 60
+        nb_available = total_hours - nb_unavailable
+        availability = (nb_available / total_hours) * 100 if total_hours > 0 else 100
+        results.append({
+            "app": app_name,
+            "total": total_hours,
+            "unavailable": nb_unavailable,
+            "available": nb_available,
+            "availability": availability
+        })
+    return results
+
+# ============================================
+# GRILLE VIRTUALISÉE DU PLANNING (COMPOSANT)
+# ============================================
+# Le composant reçoit un JSON compact (jours, applications, événements, plages par ligne)
+# et ne crée que les cellules visibles ; le tooltip est construit au survol.
+VGRID_ROW_HEIGHT = 42
+VGRID_MAX_HEIGHT = 640
+
+VGRID_TEMPLATE = """
+<style>
+    body { margin: 0; font-family: sans-serif; font-size: 13px; }
+    #vg-wrap { position: relative; overflow: auto; height: __HEIGHT__px;
+               border: 1px solid #e2e8f0; border-radius: 8px; box-sizing: border-box; }
+    #vg-view { position: absolute; top: 0; left: 0; overflow: hidden; will-change: transform; }
+    .c { position: absolute; box-sizing: border-box; text-align: center; background: #fff;
+         border-right: 1px solid #f1f5f9; border-bottom: 1px solid #f1f5f9; }
+    .h { background: #f8fafc; color: #334155; font-weight: 600; border-right: 1px solid #e2e8f0;
+         border-bottom: 2px solid #cbd5e1; padding-top: 5px; line-height: 16px; z-index: 2; }
+    .a { background: #f8fafc; color: #0f172a; font-weight: 600; text-align: left; padding: 12px 15px;
+         border-right: 2px solid #cbd5e1; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; z-index: 3; }
+    .corner { background: #f1f5f9; padding: 14px 15px; text-align: left; z-index: 4; }
+    .today-header { background: #3b82f6; color: #fff; font-weight: 700; }
+    .weekend { background: #f1f5f9; }
+    .ferie { background: #FFE6F0; }
+    .today-col { background: #eff6ff; }
+    /* Cadre du jour au-dessus du contenu (visible aussi sur les cellules avec événements) */
+    .today-col::after { content: ""; position: absolute; top: 0; left: 0; right: 0; bottom: 0; z-index: 1;
+                        box-shadow: inset 0 0 0 2px #3b82f6; pointer-events: none; }
+    .ev { display: flex; flex-direction: column; width: 100%; height: 100%; cursor: pointer; box-sizing: border-box; }
+    /* Week-end / férié : la couleur du jour reste visible au-dessus et au-dessous des événements */
+    .weekend > .ev, .ferie > .ev { padding: 4px 0; }
+    .ev div { flex: 1; display: flex; align-items: center; justify-content: center;
+              color: #fff; font-weight: bold; font-size: 11px; line-height: 1; }
+    .ev.multi div { font-size: 9px; }
+    .holiday { line-height: 42px; }
+    .mep { background: #0070C0; } .inc { background: #FF0000; } .mai { background: #FFC000; color: black !important; }
+    .test { background: #00B050; } .tnr { background: #70AD47; } .mor { background: #9600C8; }
+    .conflict { outline: 2px dashed #dc2626; outline-offset: -2px; }
+    #vg-tip { display: none; position: fixed; z-index: 10; width: 320px; max-height: 400px; overflow-y: auto;
+              background: #1e293b; color: #fff; border-radius: 6px; padding: 14px; box-sizing: border-box;
+              box-shadow: 0 10px 25px rgba(0,0,0,0.5); font-size: 12px; line-height: 1.7; pointer-events: none; }
+    .tooltip-label { color: #94a3b8; }
+    .tooltip-separator { border-top: 1px solid #475569; margin: 10px 0; padding-top: 10px; }
+</style>
+<div id="vg-wrap"><div id="vg-sizer"></div><div id="vg-view"></div></div>
+<div id="vg-tip"></div>
+<script>
+const P = __PAYLOAD__;
+const ROW_H = __ROW_HEIGHT__, COL_W = 38, APP_W = 150, HEAD_H = 44, OVERSCAN = 2;
+const DAY_LETTERS = ["L","M","M","J","V","S","D"];
+const wrap = document.getElementById("vg-wrap");
+const view = document.getElementById("vg-view");
+const tip = document.getElementById("vg-tip");
+const nRows = P.apps.length, nCols = P.days.length;
+document.getElementById("vg-sizer").style.cssText =
+    "width:" + (APP_W + nCols * COL_W) + "px;height:" + (HEAD_H + nRows * ROW_H) + "px";
+
+function esc(s) {
+    return String(s).replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+}
+// Événements d'une cellule : plages [événement, jour début, jour fin] de la ligne
+function cellEvents(r, c) {
+    const out = [];
+    for (const s of P.rows[r]) if (s[1] <= c && c <= s[2]) out.push(P.events[s[0]]);
+    return out;
+}
+function dayClass(c) {
+    const d = P.days[c];
+    return (d[4] ? " today-col" : "") + (d[2] ? " weekend" : "") + (d[3] ? " ferie" : "");
+}
+function cellHtml(r, c, x, y) {
+    const evs = cellEvents(r, c), d = P.days[c];
+    const pos = 'style="left:' + x + 'px;top:' + y + 'px;width:' + COL_W + 'px;height:' + ROW_H + 'px"';
+    if (!evs.length) {
+        const inner = d[3] && !d[2] ? '<div class="holiday">🎉</div>' : "";
+        return '<div class="c' + dayClass(c) + '" ' + pos + '>' + inner + '</div>';
+    }
+    let inner = '<div class="ev' + (evs.length > 1 ? ' multi' : '') + '" data-r="' + r + '" data-c="' + c + '">';
+    for (const e of evs) inner += '<div class="' + e[0] + (e[11] ? ' conflict' : '') + '">' + esc(e[1]) + '</div>';
+    return '<div class="c' + dayClass(c) + '" ' + pos + '>' + inner + '</div></div>';
+}
+function render() {
+    const sl = wrap.scrollLeft, st = wrap.scrollTop, w = wrap.clientWidth, h = wrap.clientHeight;
+    const c0 = Math.max(0, Math.floor(sl / COL_W) - OVERSCAN);
+    const c1 = Math.min(nCols - 1, Math.ceil((sl + w - APP_W) / COL_W) + OVERSCAN);
+    const r0 = Math.max(0, Math.floor(st / ROW_H) - OVERSCAN);
+    const r1 = Math.min(nRows - 1, Math.ceil((st + h - HEAD_H) / ROW_H) + OVERSCAN);
+    view.style.width = w + "px";
+    view.style.height = h + "px";
+    view.style.transform = "translate(" + sl + "px," + st + "px)";
+    const parts = [];
+    for (let r = r0; r <= r1; r++) {
+        const y = HEAD_H + r * ROW_H - st;
+        for (let c = c0; c <= c1; c++) parts.push(cellHtml(r, c, APP_W + c * COL_W - sl, y));
+        parts.push('<div class="c a" style="left:0;top:' + y + 'px;width:' + APP_W + 'px;height:' + ROW_H + 'px">'
+                   + esc(P.apps[r]) + '</div>');
+    }
+    for (let c = c0; c <= c1; c++) {
+        const d = P.days[c];
+        parts.push('<div class="c h' + (d[4] ? ' today-header' : '') + '" style="left:' + (APP_W + c * COL_W - sl)
+                   + 'px;top:0;width:' + COL_W + 'px;height:' + HEAD_H + 'px">' + d[0] + '<br>' + DAY_LETTERS[d[1]] + '</div>');
+    }
+    parts.push('<div class="c h corner" style="left:0;top:0;width:' + APP_W + 'px;height:' + HEAD_H + 'px">Application</div>');
+    view.innerHTML = parts.join("");
+}
+// Tooltip construit à la demande pour la cellule survolée
+function tooltipHtml(r, c) {
+    const evs = cellEvents(r, c), holiday = P.days[c][3];
+    let html = "";
+    evs.forEach((e, i) => {
+        if (i > 0) html += '<div class="tooltip-separator"></div>';
+        html += '<strong style="color:#60a5fa; font-size:13px; display:block; margin-bottom:8px;">📋 ' + esc(e[2]) + '</strong>'
+            + (e[11] ? '<span class="tooltip-label">⚠️ Conflit:</span> chevauchement incompatible<br>' : '')
+            + '<span class="tooltip-label">📱 App:</span> ' + esc(e[3]) + '<br>'
+            + (e[4] ? '<span class="tooltip-label">📁 Projet:</span> ' + esc(e[4]) + '<br>' : '')
+            + '<span class="tooltip-label">⏰ Heures:</span> ' + esc(e[5]) + ' - ' + esc(e[6]) + '<br>'
+            + '<span class="tooltip-label">📅 Dates:</span> ' + e[7] + ' au ' + e[8] + '<br>'
+            + '<span class="tooltip-label">⏱️ Durée:</span> ' + e[9] + ' jour(s)<br>'
+            + '<span class="tooltip-label">💬 Note:</span> ' + (e[10] && e[10] !== "-" ? esc(e[10]) : '<i>Aucune</i>');
+    });
+    if (holiday) html += '<br><span class="tooltip-label">🎉 Férié:</span> ' + esc(holiday);
+    return html;
+}
+view.addEventListener("mouseover", function (e) {
+    const cell = e.target.closest(".ev");
+    if (!cell) { tip.style.display = "none"; return; }
+    tip.innerHTML = tooltipHtml(+cell.dataset.r, +cell.dataset.c);
+    tip.style.display = "block";
+    const rect = cell.getBoundingClientRect();
+    let left = Math.min(Math.max(10, rect.left + rect.width / 2 - 160), window.innerWidth - 330);
+    let top = rect.top - tip.offsetHeight - 10;
+    if (top < 10) top = rect.bottom + 10;
+    if (top + tip.offsetHeight > window.innerHeight - 10) top = Math.max(10, (window.innerHeight - tip.offsetHeight) / 2);
+    tip.style.left = left + "px";
+    tip.style.top = top + "px";
+});
+view.addEventListener("mouseleave", function () { tip.style.display = "none"; });
+let pending = false;
+wrap.addEventListener("scroll", function () {
+    tip.style.display = "none";
+    if (!pending) { pending = true; requestAnimationFrame(function () { pending = false; render(); }); }
+});
+window.addEventListener("resize", render);
+render();
+</script>
+"""
+
+def render_virtual_grid(payload):
+    """Affiche la grille virtualisée ; la hauteur du cadre est bornée, le défilement est interne"""
+    height = min(VGRID_MAX_HEIGHT, 44 + VGRID_ROW_HEIGHT * len(payload["apps"]) + 20)
+    # « </ » échappé pour ne pas fermer la balise <script> depuis un commentaire
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    html = (VGRID_TEMPLATE.replace("__HEIGHT__", str(height))
+            .replace("__ROW_HEIGHT__", str(VGRID_ROW_HEIGHT))
+            .replace("__PAYLOAD__", data))
+    components.html(html, height=height + 4, scrolling=False)
+
+# ============================================
+# TOOLTIPS DU PLANNING (SCRIPT DÉLÉGUÉ)
+# ============================================
+# Un seul écouteur sur la page (installé une fois) : au survol d'une cellule, les éléments
+# qu'elle référence (data-tt) sont copiés, dans l'ordre de la cellule, dans une bulle unique
+# placée à côté de la cellule. Le composant n'a pas de hauteur ; il agit sur la page parente.
+PLANNING_TOOLTIP_SCRIPT = """
+<script>
+(function () {
+    const win = window.parent, doc = win.document;
+    if (win.planningTooltips) return;
+    win.planningTooltips = true;
+    const tip = doc.createElement("div");
+    tip.className = "planning-tooltip";
+    doc.body.appendChild(tip);
+    doc.addEventListener("mouseover", function (e) {
+        const cell = e.target.closest ? e.target.closest(".planning-table td[data-tt]") : null;
+        if (!cell) { tip.style.display = "none"; return; }
+        const stack = cell.parentElement.querySelector(".tooltip-stack");
+        let html = "";
+        cell.dataset.tt.split(" ").forEach(function (ref, i) {
+            const item = stack && stack.querySelector(".tt-" + ref);
+            if (!item) return;
+            // Événements séparés par un trait, férié ajouté à la suite
+            if (ref[0] === "h") { if (html) html += "<br>"; }
+            else if (i > 0) html += '<div class="tooltip-separator"></div>';
+            html += item.innerHTML;
+        });
+        tip.innerHTML = html;
+        tip.style.display = "block";
+        // Centré au-dessus de la cellule, sinon en dessous, sinon centré verticalement
+        const rect = cell.getBoundingClientRect();
+        const left = Math.min(Math.max(10, rect.left + rect.width / 2 - 160), win.innerWidth - 330);
+        let top = rect.top - tip.offsetHeight - 10;
+        if (top < 10) top = rect.bottom + 10;
+        if (top + tip.offsetHeight > win.innerHeight - 10) top = Math.max(10, (win.innerHeight - tip.offsetHeight) / 2);
+        tip.style.left = left + "px";
+        tip.style.top = top + "px";
+    });
+    doc.addEventListener("scroll", function () { tip.style.display = "none"; }, true);
+})();
+</script>
+"""
+
+def install_planning_tooltips():
+    """Installe (une fois par page) l'écouteur des tooltips du tableau de planning"""
+    components.html(PLANNING_TOOLTIP_SCRIPT, height=0)
+
+# ============================================
+# VUE ANNUELLE DU PLANNING (CARTE DE DENSITÉ)
+# ============================================
+
+# Fonction helper pour obtenir la classe CSS d'un type d'événement
+def get_event_class(event_type):
+    t_raw = str(event_type).upper()
+    if "MEP" in t_raw:
+        return "mep"
+    elif "INC" in t_raw:
+        return "inc"
+    elif "MAI" in t_raw:
+        return "mai"
+    elif "TEST" in t_raw:
+        return "test"
+    elif "TNR" in t_raw:
+        return "tnr"
+    elif "MOR" in t_raw:
+        return "mor"
+    return "mep"
+
+# Classes de type (ordre = priorité en cas d'égalité) et couleurs associées
+TYPE_CLASSES = ["mep", "inc", "mai", "test", "tnr", "mor"]
+TYPE_CLASS_COLORS = ["#0070C0", "#FF0000", "#FFC000", "#00B050", "#70AD47", "#9600C8"]
+TYPE_CLASS_LABELS = ["MEP", "INCIDENT", "MAINTENANCE", "TEST", "TNR", "MORATOIRE"]
+
+def compute_year_occupancy(apps, ev_apps, ev_classes, ev_d1, ev_d2, year_start, n_days):
+    """Occupation application × jour en une passe sur les événements
+    
+    ev_classes : indice dans TYPE_CLASSES de chaque événement
+    Retourne (nombre d'événements par jour, indice de la classe dominante par jour), de forme (apps, jours)
+    """
+    app_index = pd.Index(list(dict.fromkeys(apps)))
+    origin = np.datetime64(year_start, "D")
+    ev_rows = app_index.get_indexer(ev_apps)
+    ev_starts = np.maximum((ev_d1.astype("datetime64[D]") - origin).astype(np.int64), 0)
+    ev_ends = np.minimum((ev_d2.astype("datetime64[D]") - origin).astype(np.int64), n_days - 1)
+    keep = (ev_rows >= 0) & (ev_starts <= ev_ends)
+    
+    # Tableau de différences par (application, classe) puis somme cumulée sur les jours
+    diff = np.zeros((len(app_index), len(TYPE_CLASSES), n_days + 1), dtype=np.int32)
+    np.add.at(diff, (ev_rows[keep], ev_classes[keep], ev_starts[keep]), 1)
+    np.add.at(diff, (ev_rows[keep], ev_classes[keep], ev_ends[keep] + 1), -1)
+    by_class = np.cumsum(diff[:, :, :n_days], axis=2)
+    rows = app_index.get_indexer(apps)
+    return by_class.sum(axis=1)[rows], by_class.argmax(axis=1)[rows]
+
+def year_heatmap_chart(apps, counts, dominant, year_start):
+    """Carte de densité Altair (cellules occupées uniquement) ; un clic sélectionne le mois de la cellule"""
+    app_pos, day_pos = np.nonzero(counts)
+    dates = pd.to_datetime(np.datetime64(year_start, "D") + day_pos)
+    data = pd.DataFrame({
+        "Application": np.asarray(apps, dtype=object)[app_pos],
+        "Date": dates,
+        "Événements": counts[app_pos, day_pos],
+        "Type dominant": np.asarray(TYPE_CLASS_LABELS, dtype=object)[dominant[app_pos, day_pos]],
+        "mois": dates.month,
+    })
+    month_click = alt.selection_point(name="cellule", fields=["mois"], on="click")
+    return alt.Chart(data).mark_rect().encode(
+        x=alt.X("yearmonthdate(Date):T", title=None, axis=alt.Axis(format="%b", tickCount="month")),
+        y=alt.Y("Application:N", sort=list(apps), title=None),
+        color=alt.Color("Type dominant:N", scale=alt.Scale(domain=TYPE_CLASS_LABELS, range=TYPE_CLASS_COLORS),
+                        legend=alt.Legend(orient="top", title=None)),
+        opacity=alt.Opacity("Événements:Q", scale=alt.Scale(domain=[1, 3], range=[0.55, 1], clamp=True), legend=None),
+        tooltip=["Application", alt.Tooltip("Date:T", format="%d/%m/%Y"), "Type dominant", "Événements"],
+    ).add_params(month_click).properties(height=max(120, 18 * len(apps)))
 
 # --- VARIABLES ---
 TODAY = date.today()
 MONTHS_FR = ["Janvier","Février","Mars","Avril","Mai","Juin","Juillet","Août","Septembre","Octobre","Novembre","Décembre"]
 
-if "data_loaded" not in st.session_state:
-    an, af, ed, pn, pf = load_data()
-    st.session_state.apps, st.session_state.apps_data, st.session_state.events = an, af, ed
-    st.session_state.projets, st.session_state.projets_data = pn, pf
-    st.session_state.data_loaded = True
+# Données lues depuis l'instantané partagé (mis à jour par les écritures de toutes les sessions)
+collect_finished_writes()
+refresh_session()
 if "page" not in st.session_state: st.session_state.page = "planning"
 
 # ==================================================
@@ -340,6 +1866,12 @@ st.markdown("""
     .tnr, .bg-tnr { background-color: #70AD47; }
     .mor, .bg-mor { background-color: #9600C8; }
     
+    /* Événement en conflit (chevauchement incompatible sur la même application / environnement) */
+    .event-cell.conflict, .event-band.conflict {
+        outline: 2px dashed #dc2626;
+        outline-offset: -2px;
+    }
+    
     /* TOOLTIP */
     .has-tooltip { position: relative; }
     
@@ -364,11 +1896,14 @@ st.markdown("""
         background: #94a3b8;
     }
     
-    /* Tooltip avec position fixed pour sortir du conteneur */
-    .has-tooltip { position: relative; }
-    .has-tooltip .tooltip-box {
-        visibility: hidden;
-        opacity: 0;
+    /* Contenu des tooltips : une pile masquée par ligne, chaque événement y figure une fois ;
+       le script délégué (install_planning_tooltips) copie dans .planning-tooltip les éléments
+       référencés par la cellule survolée (data-tt) et le place à côté de cette cellule */
+    .tooltip-stack {
+        display: none;
+    }
+    .planning-tooltip {
+        display: none;
         width: 320px;
         max-height: 400px;
         overflow-y: auto;
@@ -380,37 +1915,56 @@ st.markdown("""
         z-index: 99999;
         box-shadow: 0 10px 25px rgba(0,0,0,0.5);
         font-size: 12px;
+        font-weight: normal;
         text-align: left;
         line-height: 1.7;
         pointer-events: none;
-        transition: opacity 0.15s, visibility 0.15s;
+        box-sizing: border-box;
+    }
+    .planning-tooltip .tooltip-label {
+        color: #94a3b8;
+    }
+    
+    /* Séparateur entre événements dans le tooltip */
+    .planning-tooltip .tooltip-separator {
+        border-top: 1px solid #475569;
+        margin: 10px 0;
+        padding-top: 10px;
     }
     
     /* Scrollbar du tooltip */
-    .has-tooltip .tooltip-box::-webkit-scrollbar {
+    .planning-tooltip::-webkit-scrollbar {
         width: 6px;
     }
-    .has-tooltip .tooltip-box::-webkit-scrollbar-track {
+    .planning-tooltip::-webkit-scrollbar-track {
         background: #334155;
         border-radius: 3px;
     }
-    .has-tooltip .tooltip-box::-webkit-scrollbar-thumb {
+    .planning-tooltip::-webkit-scrollbar-thumb {
         background: #64748b;
         border-radius: 3px;
     }
     
-    .has-tooltip:hover .tooltip-box {
-        visibility: visible;
-        opacity: 1;
-        pointer-events: auto;
+    /* Mode barres continues : marqueurs des jours superposés à une cellule multi-jours */
+    .run-marks {
+        position: absolute;
+        top: 0;
+        left: 0;
+        right: 0;
+        bottom: 0;
+        pointer-events: none;
+        z-index: 6;
     }
-    
-    /* Séparateur entre événements dans le tooltip */
-    .tooltip-separator {
-        border-top: 1px solid #475569;
-        margin: 10px 0;
-        padding-top: 10px;
+    .event-run .run-marks { opacity: 0.35; }
+    .run-marks span, .run-marks .run-today {
+        position: absolute;
+        top: 0;
+        bottom: 0;
+        display: flex;
+        align-items: center;
+        justify-content: center;
     }
+    .run-marks .run-today { background-color: #eff6ff; box-shadow: inset 0 0 0 2px #3b82f6; }
     
     /* Badge compteur d'événements */
     .event-count {
@@ -425,65 +1979,6 @@ st.markdown("""
         border-radius: 3px;
     }
 </style>
-
-<script>
-document.addEventListener('DOMContentLoaded', function() {
-    // Fonction pour positionner les tooltips
-    function setupTooltips() {
-        const cells = document.querySelectorAll('.has-tooltip');
-        
-        cells.forEach(cell => {
-            const tooltip = cell.querySelector('.tooltip-box');
-            if (!tooltip) return;
-            
-            cell.addEventListener('mouseenter', function(e) {
-                const rect = cell.getBoundingClientRect();
-                const tooltipRect = tooltip.getBoundingClientRect();
-                const viewportHeight = window.innerHeight;
-                const viewportWidth = window.innerWidth;
-                
-                // Position horizontale - centré sur la cellule
-                let left = rect.left + rect.width / 2 - 160; // 160 = moitié de 320px
-                
-                // Ajuster si dépasse à droite
-                if (left + 320 > viewportWidth - 10) {
-                    left = viewportWidth - 330;
-                }
-                // Ajuster si dépasse à gauche
-                if (left < 10) {
-                    left = 10;
-                }
-                
-                // Position verticale - au-dessus par défaut
-                let top = rect.top - tooltip.offsetHeight - 10;
-                
-                // Si pas assez de place en haut, mettre en bas
-                if (top < 10) {
-                    top = rect.bottom + 10;
-                }
-                
-                // Si toujours pas assez de place (en bas), centrer verticalement
-                if (top + tooltip.offsetHeight > viewportHeight - 10) {
-                    top = Math.max(10, (viewportHeight - tooltip.offsetHeight) / 2);
-                }
-                
-                tooltip.style.left = left + 'px';
-                tooltip.style.top = top + 'px';
-            });
-        });
-    }
-    
-    // Setup initial et après chaque changement Streamlit
-    setupTooltips();
-    
-    // Observer les changements du DOM pour les tabs Streamlit
-    const observer = new MutationObserver(function(mutations) {
-        setupTooltips();
-    });
-    
-    observer.observe(document.body, { childList: true, subtree: true });
-});
-</script>
 """, unsafe_allow_html=True)
 
 # ==================================================
@@ -494,11 +1989,13 @@ with st.sidebar:
     if st.button("📅 Planning", use_container_width=True): st.session_state.page = "planning"; st.rerun()
     if st.button("📊 Dashboard", use_container_width=True): st.session_state.page = "dashboard"; st.rerun()
     if st.button("📝 Événements", use_container_width=True): st.session_state.page = "events"; st.rerun()
+    if st.button("📥 Import", use_container_width=True): st.session_state.page = "import"; st.rerun()
     if st.button("📱 Applications", use_container_width=True): st.session_state.page = "apps"; st.rerun()
     if st.button("📁 Projets", use_container_width=True): st.session_state.page = "projets"; st.rerun()
     st.divider()
     years_list = [2026, 2027, 2028, 2029, 2030]
     sel_year = st.selectbox("Année", years_list, index=years_list.index(TODAY.year) if TODAY.year in years_list else 0)
+    ensure_events_year(sel_year)
     st.divider()
     
     # FORMULAIRE D'AJOUT RAPIDE (uniquement sur la page planning)
@@ -542,26 +2039,53 @@ with st.sidebar:
                     "comment": q_comment,
                     "projet": q_projet if q_projet != "(Aucun)" else None
                 }
-                with st.spinner("Ajout en cours..."):
-                    # Utiliser la nouvelle fonction optimisée
-                    added_event = add_event_db(new_event)
-                    if added_event:
-                        st.session_state.events.append(added_event)
-                        
-                        # Mémoriser l'environnement et le mois pour la navigation après rerun
-                        st.session_state.nav_to_env = q_env
-                        st.session_state.nav_to_month = q_d1.month - 1  # Index 0-based pour les tabs
-                        st.session_state.nav_to_year = q_d1.year
-                        
-                        st.success("✅ Événement ajouté !")
-                        time.sleep(0.5)
-                        st.rerun()
-                    else:
-                        st.error("❌ Erreur lors de l'ajout")
+                if supabase:
+                    # Chevauchements incompatibles signalés (l'ajout est conservé)
+                    report_conflicts(find_conflicts([new_event], st.session_state.events))
+                    # Affiché tout de suite, enregistré en arrière-plan
+                    queue_add_events([new_event], f"Ajout {q_type} {q_app}")
+                    
+                    # Mémoriser l'environnement et le mois pour la navigation après rerun
+                    st.session_state.nav_to_env = q_env
+                    st.session_state.nav_to_month = q_d1.month - 1  # Index 0-based pour les tabs
+                    st.session_state.nav_to_year = q_d1.year
+                    
+                    st.toast("✅ Événement ajouté !")
+                    st.rerun()
+                else:
+                    st.error("❌ Erreur lors de l'ajout")
         
         st.divider()
     
-    if st.button("🔄 Actualiser"): del st.session_state.data_loaded; st.rerun()
+    if st.button("🔄 Actualiser"): sync_data(); st.rerun()
+    
+    # Suivi des écritures en arrière-plan (rempli en fin de script)
+    write_status_box = st.container()
+    for failure in st.session_state.failed_writes:
+        st.error(f"❌ Échec d'enregistrement, modification annulée — {failure}")
+    if st.session_state.failed_writes and st.button("✖️ Masquer les erreurs"):
+        st.session_state.failed_writes.clear()
+        st.rerun()
+    
+    # Conflits détectés lors du dernier ajout / de la dernière sauvegarde
+    conflict_warnings = st.session_state.get("conflict_warnings", [])
+    if conflict_warnings:
+        st.warning(f"⚠️ {len(conflict_warnings)} conflit(s) de planning détecté(s)")
+        for label in conflict_warnings[:10]:
+            st.caption(f"• {label}")
+        if len(conflict_warnings) > 10:
+            st.caption(f"… et {len(conflict_warnings) - 10} autre(s)")
+        if st.button("✖️ Masquer les conflits"):
+            st.session_state.conflict_warnings = []
+            st.rerun()
+    
+    # Latences et erreurs par table / opération (depuis le démarrage du serveur)
+    with st.expander("📶 Accès base"):
+        stats_df = db_stats_frame()
+        if stats_df.empty:
+            st.caption("Aucune requête pour l'instant")
+        else:
+            st.dataframe(stats_df, hide_index=True, use_container_width=True)
 
 # ==================================================
 # 4. PAGES
@@ -571,8 +2095,9 @@ if st.session_state.page == "apps":
     st.title("📱 Gestion des Applications")
     
     # Préparation des données
-    clean_data = [{"Nom": i.get('nom', ''), "Ordre": i.get('ordre', 0)} for i in st.session_state.apps_data]
-    df_apps = pd.DataFrame(clean_data if clean_data else None, columns=["Nom", "Ordre"])
+    # L'id (colonne masquée) permet de ne modifier que les lignes changées à la sauvegarde
+    clean_data = [{"id": i.get('id'), "Nom": i.get('nom', ''), "Ordre": i.get('ordre', 0)} for i in st.session_state.apps_data]
+    df_apps = pd.DataFrame(clean_data if clean_data else None, columns=["id", "Nom", "Ordre"])
     
     # Data editor avec configuration
     edited_apps = st.data_editor(
@@ -582,13 +2107,14 @@ if st.session_state.page == "apps":
         hide_index=True, 
         key="ed_apps",
         column_config={
+            "id": None,
             "Nom": st.column_config.TextColumn("Nom", help="Nom de l'application (majuscules)", max_chars=50, required=True),
             "Ordre": st.column_config.NumberColumn("Ordre", help="Ordre d'affichage", min_value=0, max_value=999, step=1, required=True)
         }
     )
     
     # Afficher le nombre d'applications
-    nb_apps = len([row for _, row in edited_apps.iterrows() if row['Nom'] and str(row['Nom']).strip()])
+    nb_apps = int((filled_text(edited_apps["Nom"]) != "").sum())
     st.caption(f"📊 {nb_apps} application(s)")
     
     col1, col2, col3 = st.columns([1, 1, 3])
@@ -598,40 +2124,31 @@ if st.session_state.page == "apps":
         cancel_btn = st.button("↩️ Annuler", use_container_width=True)
     
     if save_btn:
-        # Validation
-        valid_apps = []
-        errors = []
-        
-        for idx, row in edited_apps.iterrows():
-            nom = str(row['Nom']).strip() if pd.notnull(row['Nom']) else ""
-            
-            if nom:  # Seulement si le nom n'est pas vide
-                if pd.isnull(row['Ordre']):
-                    errors.append(f"⚠️ Ligne {idx+1}: L'ordre est obligatoire pour '{nom}'")
-                else:
-                    valid_apps.append({"Nom": nom.upper(), "Ordre": int(row['Ordre'])})
+        # Validation (lignes avec un nom uniquement)
+        errors, valid_apps = validate_apps(edited_apps)
         
         if errors:
             for err in errors:
                 st.error(err)
-        elif not valid_apps:
+        elif valid_apps.empty:
             st.warning("⚠️ Aucune application à sauvegarder")
         else:
             # Vérifier les doublons
-            noms = [app['Nom'] for app in valid_apps]
-            if len(noms) != len(set(noms)):
+            if valid_apps["Nom"].duplicated().any():
                 st.error("⚠️ Il y a des noms d'applications en double")
             else:
                 with st.spinner("Sauvegarde en cours..."):
-                    df_to_save = pd.DataFrame(valid_apps).sort_values(by="Ordre")
-                    save_apps_db(df_to_save)
-                    st.success(f"✅ {len(valid_apps)} application(s) sauvegardée(s) avec succès !")
-                    time.sleep(1)
-                    del st.session_state.data_loaded
-                    st.rerun()
+                    df_to_save = valid_apps.reset_index(drop=True).sort_values(by="Ordre")
+                    saved = save_apps_db(df_to_save)
+                    sync_data()
+                    if saved:
+                        st.toast(f"✅ {len(valid_apps)} application(s) sauvegardée(s) avec succès !")
+                        st.rerun()
     
     if cancel_btn:
-        del st.session_state.data_loaded
+        # Abandonner les modifications de l'éditeur
+        st.session_state.pop("ed_apps", None)
+        sync_data()
         st.rerun()
 
 elif st.session_state.page == "projets":
@@ -653,7 +2170,7 @@ elif st.session_state.page == "projets":
     )
     
     # Afficher le nombre de projets
-    nb_projets = len([row for _, row in edited_projets.iterrows() if row['Projet'] and str(row['Projet']).strip()])
+    nb_projets = int((filled_text(edited_projets["Projet"]) != "").sum())
     st.caption(f"📊 {nb_projets} projet(s)")
     
     col1, col2, col3 = st.columns([1, 1, 3])
@@ -664,21 +2181,23 @@ elif st.session_state.page == "projets":
     
     if save_btn:
         # Récupérer les projets valides
-        valid_projets = [str(row['Projet']).upper().strip() for _, row in edited_projets.iterrows() if row['Projet'] and str(row['Projet']).strip()]
+        valid_projets = validate_projets(edited_projets)
         
         # Vérifier les doublons
         if len(valid_projets) != len(set(valid_projets)):
             st.error("⚠️ Il y a des noms de projets en double")
         else:
             with st.spinner("Sauvegarde en cours..."):
-                save_projets_db(valid_projets)
-                st.success(f"✅ {len(valid_projets)} projet(s) sauvegardé(s) avec succès !")
-                time.sleep(1)
-                del st.session_state.data_loaded
-                st.rerun()
+                saved = save_projets_db(valid_projets)
+                sync_data()
+                if saved:
+                    st.toast(f"✅ {len(valid_projets)} projet(s) sauvegardé(s) avec succès !")
+                    st.rerun()
     
     if cancel_btn:
-        del st.session_state.data_loaded
+        # Abandonner les modifications de l'éditeur
+        st.session_state.pop("ed_projets", None)
+        sync_data()
         st.rerun()
 
 elif st.session_state.page == "events":
@@ -688,6 +2207,8 @@ elif st.session_state.page == "events":
     else:
         # FILTRES RAPIDES
         st.markdown("### 🔍 Filtres rapides")
+        search_query = st.text_input("🔎 Rechercher", key="events_search",
+                                     placeholder="Commentaire, application, projet ou type (ex. INC-64)")
         col_f1, col_f2, col_f3, col_f4 = st.columns(4)
         
         with col_f1:
@@ -699,38 +2220,80 @@ elif st.session_state.page == "events":
         with col_f4:
             filter_projet = st.selectbox("📁 Projet", ["Tous", "(Sans projet)"] + st.session_state.projets, key="filter_projet")
         
-        st.divider()
+        # Filtres communs aux deux modes (masque sur la table en mémoire ou requête en base)
+        filters = {
+            "app": filter_app if filter_app != "Toutes" else None,
+            "env": filter_env if filter_env != "Tous" else None,
+            "type": filter_type if filter_type != "Tous" else None,
+            "projet": filter_projet if filter_projet not in ("Tous", "(Sans projet)") else None,
+            "no_projet": filter_projet == "(Sans projet)",
+        }
         
-        # Préparation des données avec les IDs
-        events_with_ids = st.session_state.events if st.session_state.events else []
+        # Mode paginé : filtres et pagination exécutés par Supabase, une page éditée à la fois
+        paged = st.toggle("📄 Pagination côté base", key="events_paged",
+                          help="Charge uniquement la page affichée (toutes années), filtrée par la base")
         
-        # Créer un DataFrame avec l'id inclus
-        if events_with_ids:
-            df_evts = pd.DataFrame(events_with_ids)
-            cols_with_id = ["id", "app", "env", "type", "projet", "d1", "d2", "h1", "h2", "comment"]
-            # S'assurer que toutes les colonnes existent
-            for col in cols_with_id:
-                if col not in df_evts.columns:
-                    df_evts[col] = None
-            display_df = df_evts[cols_with_id].copy()
-        else:
-            display_df = pd.DataFrame(columns=["id", "app", "env", "type", "projet", "d1", "d2", "h1", "h2", "comment"])
+        st.divider()
         
-        # Sauvegarder les IDs originaux avant filtrage
-        original_ids = set(display_df['id'].dropna().tolist())
+        # Table des événements avec les IDs (colonnaire + version éditable, construites une fois par instantané)
+        events_frame, display_df = get_events_editor_frame()
         
-        # Appliquer les filtres pour l'affichage
-        filtered_df = display_df.copy()
-        if filter_app != "Toutes":
-            filtered_df = filtered_df[filtered_df['app'] == filter_app]
-        if filter_env != "Tous":
-            filtered_df = filtered_df[filtered_df['env'] == filter_env]
-        if filter_type != "Tous":
-            filtered_df = filtered_df[filtered_df['type'] == filter_type]
-        if filter_projet == "(Sans projet)":
-            filtered_df = filtered_df[filtered_df['projet'].isna() | (filtered_df['projet'] == "") | (filtered_df['projet'].isnull())]
-        elif filter_projet != "Tous":
-            filtered_df = filtered_df[filtered_df['projet'] == filter_projet]
+        if paged:
+            col_p1, col_p2, col_p3 = st.columns([1, 1, 3])
+            with col_p1:
+                page_size = st.selectbox("Lignes par page", [50, 100, 250, 500], index=1, key="events_page_size")
+            
+            # Retour à la première page quand les filtres ou la taille de page changent
+            filter_key = (tuple(filters.items()), search_query, page_size)
+            if st.session_state.get("events_page_filter_key") != filter_key:
+                st.session_state.events_page_filter_key = filter_key
+                st.session_state.events_page_no = 1
+            with col_p2:
+                page_no = st.number_input("Page", min_value=1, step=1, key="events_page_no")
+            
+            # Page rechargée si elle change, ou si les données ont changé tant que rien n'est
+            # en cours (écriture de la session ou modification non sauvegardée dans l'éditeur)
+            page_cache = st.session_state.get("events_page_cache")
+            page_key = (filter_key, page_no)
+            data_version = st.session_state.get("data_version", 0)
+            editor_state = st.session_state.get("ed_evts") or {}
+            editing = any(editor_state.get(k) for k in ("edited_rows", "added_rows", "deleted_rows"))
+            outdated = page_cache is not None and page_cache["version"] != data_version
+            # Après une sauvegarde de la page, rechargement dès la fin des écritures de la session
+            reload_saved = page_cache is not None and page_cache.get("saved") and not st.session_state.pending_writes
+            if (page_cache is None or page_cache["key"] != page_key or reload_saved
+                    or (outdated and not editing and not st.session_state.pending_writes)):
+                try:
+                    page_events, page_total = fetch_events_page(filters, page_no - 1, page_size, search_query)
+                except Exception as e:
+                    st.error(f"Erreur lecture : {e}")
+                    page_events, page_total = [], 0
+                page_cache = {"key": page_key, "version": data_version,
+                              "events": {ev['id']: ev for ev in page_events}, "total": page_total,
+                              "df": editor_frame(build_events_frame(page_events))}
+                st.session_state.events_page_cache = page_cache
+                # Nouvelle page : les modifications en cours dans l'éditeur ne s'y appliquent pas
+                st.session_state.pop("ed_evts", None)
+            
+            elif outdated and editing:
+                st.info("ℹ️ Données modifiées depuis l'affichage de cette page : sauvegardez ou annulez "
+                        "vos modifications pour la recharger")
+            
+            n_pages = max(1, -(-page_cache["total"] // page_size))
+            with col_p3:
+                st.caption(f"📄 Page {page_no} / {n_pages} — {page_cache['total']} événement(s) correspondant aux filtres")
+            filtered_df = page_cache["df"]
+        else:
+            # Appliquer les filtres pour l'affichage (masque calculé sur les colonnes catégorielles)
+            filter_mask = events_mask(events_frame, **filters)
+            if search_query.strip():
+                filter_mask &= events_frame["id"].isin(search_event_ids(search_query)).to_numpy()
+            # Ajouts en cours d'enregistrement (toutes sessions) : pas encore modifiables
+            inflight_mask = filter_mask & events_frame["id"].isin(inflight_event_ids()).to_numpy()
+            if inflight_mask.any():
+                st.caption(f"⏳ {int(inflight_mask.sum())} événement(s) en cours d'enregistrement, "
+                           "modifiables une fois confirmés")
+            filtered_df = display_df[filter_mask & ~inflight_mask]
         
         # Sauvegarder les IDs filtrés pour détecter les suppressions
         filtered_ids_before = set(filtered_df['id'].dropna().tolist())
@@ -760,23 +2323,37 @@ elif st.session_state.page == "events":
         )
         
         # Afficher le nombre d'événements
-        nb_events = len([r for _, r in edited_evts.iterrows() if pd.notnull(r.get("app")) and pd.notnull(r.get("d1"))])
-        nb_total = len([r for _, r in display_df.iterrows() if pd.notnull(r.get("app")) and pd.notnull(r.get("d1"))])
+        nb_events = int((edited_evts["app"].notna() & edited_evts["d1"].notna()).sum())
+        nb_total = int((events_frame["app"].notna() & events_frame["d1"].notna()).sum())
         
-        if filter_app != "Toutes" or filter_env != "Tous" or filter_type != "Tous" or filter_projet != "Tous":
+        if paged:
+            st.caption(f"📊 {nb_events} événement(s) sur cette page")
+        elif (filter_app != "Toutes" or filter_env != "Tous" or filter_type != "Tous" or filter_projet != "Tous"
+              or search_query.strip()):
             st.caption(f"📊 {nb_events} événement(s) affiché(s) sur {nb_total} au total (filtres actifs)")
         else:
             st.caption(f"📊 {nb_events} événement(s)")
+        if not paged:
+            years_txt = ", ".join(str(y) for y in sorted(st.session_state.events_years))
+            st.caption(f"📅 Années chargées : {years_txt} (choisir une autre année dans le menu pour la charger)")
         
         col1, col2, col3 = st.columns([1, 1, 3])
         with col1:
-            save_btn = st.button("💾 Sauvegarder", type="primary", use_container_width=True)
+            # Pas de sauvegarde tant que des lignes ajoutées n'ont pas reçu leur id définitif
+            save_btn = st.button("💾 Sauvegarder", type="primary", use_container_width=True,
+                                 disabled=bool(st.session_state.pending_writes))
         with col2:
             cancel_btn = st.button("↩️ Annuler", use_container_width=True)
         
         if save_btn:
-            # Analyser les changements
-            errors = []
+            # Versions d'origine des lignes affichées (pour ne sauvegarder que les lignes modifiées)
+            if paged:
+                original_by_id = st.session_state.events_page_cache["events"]
+            else:
+                original_by_id = {ev['id']: ev for ev in st.session_state.events if ev['id'] in filtered_ids_before}
+            
+            # Analyser les changements (validation sur colonnes : champs obligatoires, dates, heures)
+            errors, valid_events = validate_events(edited_evts)
             to_add = []
             to_update = []
             to_delete = []
@@ -784,64 +2361,16 @@ elif st.session_state.page == "events":
             # IDs présents après édition
             edited_ids = set()
             
-            for idx, r in edited_evts.iterrows():
-                # Vérifier que les champs obligatoires sont remplis
-                if pd.notnull(r.get("app")):
-                    ligne = idx + 1
-                    
-                    # Validation des champs obligatoires
-                    if pd.isnull(r.get("env")):
-                        errors.append(f"⚠️ Ligne {ligne}: Environnement obligatoire")
-                        continue
-                    if pd.isnull(r.get("type")):
-                        errors.append(f"⚠️ Ligne {ligne}: Type obligatoire")
-                        continue
-                    if pd.isnull(r.get("d1")):
-                        errors.append(f"⚠️ Ligne {ligne}: Date début obligatoire")
-                        continue
-                    
-                    # Date de fin par défaut = date de début
-                    d1 = r["d1"]
-                    d2 = r["d2"] if pd.notnull(r.get("d2")) else d1
-                    
-                    # Validation cohérence des dates
-                    if d2 < d1:
-                        errors.append(f"⚠️ Ligne {ligne}: Date fin avant date début")
-                        continue
-                    
-                    # Validation heures
-                    h1 = str(r.get("h1", "00:00")).strip() if pd.notnull(r.get("h1")) else "00:00"
-                    h2 = str(r.get("h2", "23:59")).strip() if pd.notnull(r.get("h2")) else "23:59"
-                    
-                    if not (len(h1) == 5 and h1[2] == ":"):
-                        errors.append(f"⚠️ Ligne {ligne}: Format heure début invalide (attendu HH:MM)")
-                        continue
-                    if not (len(h2) == 5 and h2[2] == ":"):
-                        errors.append(f"⚠️ Ligne {ligne}: Format heure fin invalide (attendu HH:MM)")
-                        continue
-                    
-                    # Préparer l'événement
-                    event_data = {
-                        "app": r["app"],
-                        "env": r["env"],
-                        "type": r["type"],
-                        "d1": d1,
-                        "d2": d2,
-                        "h1": h1,
-                        "h2": h2,
-                        "comment": str(r.get("comment", "")).strip(),
-                        "projet": r.get("projet") if pd.notnull(r.get("projet")) and r.get("projet") != "" else None
-                    }
-                    
-                    # Déterminer si c'est un ajout ou une modification
-                    event_id = r.get("id")
-                    if pd.notnull(event_id) and event_id in filtered_ids_before:
-                        # Événement existant -> UPDATE
-                        edited_ids.add(event_id)
+            for event_id, event_data in valid_events:
+                # Déterminer si c'est un ajout ou une modification
+                if pd.notnull(event_id) and event_id in filtered_ids_before:
+                    # Événement existant -> UPDATE seulement s'il a changé
+                    edited_ids.add(event_id)
+                    if event_changed(original_by_id[int(event_id)], event_data):
                         to_update.append({"id": int(event_id), "data": event_data})
-                    else:
-                        # Nouvel événement -> INSERT
-                        to_add.append(event_data)
+                else:
+                    # Nouvel événement -> INSERT
+                    to_add.append(event_data)
             
             # Détecter les suppressions (IDs qui étaient dans filtered_ids_before mais plus dans edited_ids)
             to_delete = list(filtered_ids_before - edited_ids)
@@ -850,63 +2379,92 @@ elif st.session_state.page == "events":
             if errors:
                 for err in errors:
                     st.error(err)
+            elif not supabase:
+                st.error("❌ Des erreurs se sont produites lors de la sauvegarde")
             else:
-                with st.spinner("Sauvegarde en cours..."):
-                    success = True
-                    added_count = 0
-                    updated_count = 0
-                    deleted_count = 0
-                    
-                    # Supprimer les événements
-                    if to_delete:
-                        if delete_events_db(to_delete):
-                            deleted_count = len(to_delete)
-                            # Mettre à jour le session_state
-                            st.session_state.events = [ev for ev in st.session_state.events if ev.get('id') not in to_delete]
-                        else:
-                            success = False
-                    
-                    # Ajouter les nouveaux événements
-                    for event_data in to_add:
-                        added_event = add_event_db(event_data)
-                        if added_event:
-                            st.session_state.events.append(added_event)
-                            added_count += 1
-                        else:
-                            success = False
-                    
-                    # Mettre à jour les événements existants
-                    for update_info in to_update:
-                        if update_event_db(update_info["id"], update_info["data"]):
-                            # Mettre à jour le session_state
-                            for i, ev in enumerate(st.session_state.events):
-                                if ev.get('id') == update_info["id"]:
-                                    st.session_state.events[i].update(update_info["data"])
-                                    break
-                            updated_count += 1
-                        else:
-                            success = False
-                    
-                    if success:
-                        summary = []
-                        if added_count: summary.append(f"{added_count} ajouté(s)")
-                        if updated_count: summary.append(f"{updated_count} modifié(s)")
-                        if deleted_count: summary.append(f"{deleted_count} supprimé(s)")
-                        
-                        if summary:
-                            st.success(f"✅ Sauvegarde réussie ! ({', '.join(summary)})")
-                        else:
-                            st.info("ℹ️ Aucune modification détectée")
-                        
-                        time.sleep(1)
-                        st.rerun()
-                    else:
-                        st.error("❌ Des erreurs se sont produites lors de la sauvegarde")
+                # Chevauchements incompatibles des lignes ajoutées / modifiées (la sauvegarde est conservée)
+                replaced = set(to_delete) | {u["id"] for u in to_update}
+                report_conflicts(find_conflicts(
+                    to_add + [u["data"] for u in to_update],
+                    [ev for ev in st.session_state.events if ev['id'] not in replaced]))
+                
+                # Changements affichés tout de suite, enregistrés en arrière-plan (dans cet ordre)
+                if to_delete:
+                    queue_delete_events(to_delete, original_by_id, f"Suppression de {len(to_delete)} événement(s)")
+                if to_add:
+                    queue_add_events(to_add, f"Ajout de {len(to_add)} événement(s)")
+                if to_update:
+                    queue_update_events(to_update, original_by_id, f"Modification de {len(to_update)} événement(s)")
+                
+                summary = []
+                if to_add: summary.append(f"{len(to_add)} ajouté(s)")
+                if to_update: summary.append(f"{len(to_update)} modifié(s)")
+                if to_delete: summary.append(f"{len(to_delete)} supprimé(s)")
+                
+                if summary:
+                    if paged:
+                        # Page affichée corrigée tout de suite (suppressions, modifications) ;
+                        # elle est relue en base, ajouts compris, une fois les écritures terminées
+                        page_cache = st.session_state.events_page_cache
+                        removed = {int(event_id) for event_id in to_delete}
+                        page_events = {event_id: ev for event_id, ev in page_cache["events"].items() if event_id not in removed}
+                        for u in to_update:
+                            page_events[u["id"]] = {**page_events[u["id"]], **u["data"]}
+                        page_cache.update(events=page_events, saved=True,
+                                          df=editor_frame(build_events_frame(list(page_events.values()))))
+                    # Les modifications font désormais partie des données : l'éditeur repart de zéro
+                    st.session_state.pop("ed_evts", None)
+                    st.toast(f"✅ Sauvegarde lancée ! ({', '.join(summary)})")
+                    st.rerun()
+                else:
+                    st.info("ℹ️ Aucune modification détectée")
         
         if cancel_btn:
-            del st.session_state.data_loaded
+            # Abandonner les modifications de l'éditeur
+            st.session_state.pop("ed_evts", None)
+            sync_data()
             st.rerun()
 
+elif st.session_state.page == "import":
+    st.title("📥 Import d'Événements")
+    st.caption("Colonnes : app, env, type, d1, d2, h1, h2, comment, projet (d2, h1, h2, comment et projet facultatifs). "
+               "Dates AAAA-MM-JJ ou JJ/MM/AAAA, heures HH:MM. Applications et projets doivent déjà exister.")
+    
+    uploaded = st.file_uploader("📄 Fichier CSV ou Excel", type=["csv", "xlsx"], key="import_file")
+    
+    if uploaded:
+        col1, col2, col3 = st.columns([1, 1, 3])
+        with col1:
+            check_btn = st.button("🔍 Vérifier", use_container_width=True)
+        with col2:
+            import_btn = st.button("📥 Importer", type="primary", use_container_width=True, disabled=not supabase)
+        
+        if check_btn or import_btn:
+            uploaded.seek(0)
+            progress = st.progress(0.0, text="Lecture du fichier...")
+            def show_progress(fraction, stats):
+                label = "vérifiée(s)" if check_btn else f"lue(s), {stats['imported']} importée(s)"
+                progress.progress(fraction, text=f"{stats['rows']} ligne(s) {label}")
+            try:
+                stats = import_events_file(uploaded, st.session_state.apps, st.session_state.projets,
+                                           dry_run=check_btn, on_progress=show_progress)
+            except Exception as e:
+                st.error(f"Erreur lecture du fichier : {e}")
+            else:
+                progress.progress(1.0, text=f"{stats['rows']} ligne(s) traitée(s)")
+                if check_btn:
+                    st.info(f"🔍 {stats['valid']} ligne(s) valide(s) sur {stats['rows']}")
+                elif stats["failed"]:
+                    st.error(f"❌ Import interrompu : {stats['imported']} événement(s) importé(s)")
+                else:
+                    st.success(f"✅ {stats['imported']} événement(s) importé(s) sur {stats['rows']} ligne(s)")
+                if stats["error_count"]:
+                    st.warning(f"⚠️ {stats['error_count']} ligne(s) en erreur ignorée(s)")
+                    for err in stats["errors"]:
+                        st.error(err)
+                    if stats["error_count"] > len(stats["errors"]):
+                        st.caption(f"… et {stats['error_count'] - len(stats['errors'])} autre(s)")
+
 elif st.session_state.page == "planning":
     st.title(f"📅 Planning Visuel {sel_year}")
     
@@ -937,35 +2495,36 @@ elif st.session_state.page == "planning":
         else:
             st.caption(f"ℹ️ Affichage du projet **{projet_filter}** + événements sans projet")
     
-    fr_holidays = holidays.France(years=sel_year)
+    year_cal = get_year_calendar(sel_year)
+    
+    # Retour au tableau du mois cliqué depuis la vue annuelle
+    if "nav_to_view" in st.session_state:
+        st.session_state.planning_view = st.session_state.nav_to_view
+        st.session_state.planning_lazy = True
+        del st.session_state.nav_to_view
+    
+    # Affichage : tableau HTML, vue annuelle ou grille virtualisée (pour un grand nombre d'applications)
+    view_mode = st.radio("Affichage :", ["📋 Tableau", "📏 Barres continues", "🗓️ Année", "🚀 Grille virtualisée"],
+                         horizontal=True, key="planning_view",
+                         help="Barres continues : une seule cellule par suite de jours ayant les mêmes événements")
+    bars_mode = view_mode == "📏 Barres continues"
+    
+    # Mode de rendu : un seul mois (rapide) ou les 12 onglets
+    lazy_mode = view_mode in ("📋 Tableau", "📏 Barres continues") and st.toggle(
+        "⚡ Afficher uniquement le mois sélectionné", value=True, key="planning_lazy",
+        help="Seul le mois choisi est construit à chaque rafraîchissement")
+    
+    # Mois affiché par défaut : mois courant
+    if "planning_month" not in st.session_state:
+        st.session_state.planning_month = MONTHS_FR[TODAY.month - 1]
     
     # Récupérer le mois de navigation (après ajout d'événement)
-    default_tab = None
     if "nav_to_month" in st.session_state:
-        default_tab = MONTHS_FR[st.session_state.nav_to_month]
+        st.session_state.planning_month = MONTHS_FR[st.session_state.nav_to_month]
         del st.session_state.nav_to_month
     if "nav_to_year" in st.session_state:
         del st.session_state.nav_to_year
-    
-    tabs = st.tabs(MONTHS_FR)
-
-    # Fonction helper pour obtenir la classe CSS d'un type d'événement
-    def get_event_class(event_type):
-        t_raw = str(event_type).upper()
-        if "MEP" in t_raw:
-            return "mep"
-        elif "INC" in t_raw:
-            return "inc"
-        elif "MAI" in t_raw:
-            return "mai"
-        elif "TEST" in t_raw:
-            return "test"
-        elif "TNR" in t_raw:
-            return "tnr"
-        elif "MOR" in t_raw:
-            return "mor"
-        return "mep"
-    
+
     # Fonction pour filtrer les événements selon le projet (RECETTE uniquement)
     def should_show_event(ev, env_sel, projet_filter):
         # Vérifier l'environnement
@@ -989,108 +2548,251 @@ elif st.session_state.page == "planning":
             # Afficher le projet sélectionné + les événements sans projet
             return has_no_projet or ev_projet == projet_filter
 
-    for i, tab in enumerate(tabs):
-        with tab:
-            m = i + 1
-            days_in_m = calendar.monthrange(sel_year, m)[1]
-            dates_m = [date(sel_year, m, d) for d in range(1, days_in_m + 1)]
-            
-            if not st.session_state.apps:
-                st.info("Aucune application enregistrée.")
-                continue
+    # Événements en conflit, mis en évidence dans la grille
+    conflict_ids = get_conflict_ids()
+    
+    # Contenu du tooltip d'un événement
+    def event_tooltip_html(ev):
+        dur = (ev["d2"] - ev["d1"]).days + 1
+        comment_text = str(ev.get('comment', '-')).replace('<', '&lt;').replace('>', '&gt;')
+        projet_text = ev.get('projet') if ev.get('projet') and ev.get('projet') != "" else None
+        projet_line = f'<span class="tooltip-label">📁 Projet:</span> {projet_text}<br>' if projet_text else ''
+        conflict_line = ('<span class="tooltip-label">⚠️ Conflit:</span> chevauchement incompatible<br>'
+                         if ev['id'] in conflict_ids else '')
+        return f'''<strong style="color:#60a5fa; font-size:13px; display:block; margin-bottom:8px;">📋 {ev['type']}</strong>
+{conflict_line}<span class="tooltip-label">📱 App:</span> {ev['app']}<br>
+{projet_line}<span class="tooltip-label">⏰ Heures:</span> {ev.get('h1','00:00')} - {ev.get('h2','23:59')}<br>
+<span class="tooltip-label">📅 Dates:</span> {ev['d1'].strftime('%d/%m')} au {ev['d2'].strftime('%d/%m')}<br>
+<span class="tooltip-label">⏱️ Durée:</span> {dur} jour(s)<br>
+<span class="tooltip-label">💬 Note:</span> {comment_text if comment_text and comment_text != '-' else '<i>Aucune</i>'}'''
 
-            # CONSTRUCTION TABLEAU
-            html = f'<div class="planning-wrap"><table class="planning-table"><thead><tr><th class="app-header">Application</th>'
+    # Contenu affiché d'une cellule : un événement en entier, plusieurs en bandes
+    def events_content_html(matching_events):
+        if len(matching_events) == 1:
+            # UN SEUL événement - affichage classique
+            ev = matching_events[0]
+            t_cls = get_event_class(ev["type"])
+            t_raw = str(ev["type"]).upper()
+            c_cls = " conflict" if ev['id'] in conflict_ids else ""
+            return f'<div class="event-cell {t_cls}{c_cls}">{t_raw[:3]}</div>'
+        # PLUSIEURS événements - affichage en bandes
+        content = '<div class="multi-event">'
+        for ev in matching_events:
+            t_cls = get_event_class(ev["type"])
+            t_raw = str(ev["type"]).upper()
+            c_cls = " conflict" if ev['id'] in conflict_ids else ""
+            content += f'<div class="event-band bg-{t_cls}{c_cls}">{t_raw[:3]}</div>'
+        return content + '</div>'
+    
+    # Marqueurs week-end / férié / aujourd'hui superposés à une plage de jours [a, b[ du mois
+    def run_marks_html(dates_m, first_idx, a, b, show_holiday):
+        span = b - a
+        stops, icons = [], ""
+        for j in range(a, b):
+            is_weekend = year_cal["weekend"][first_idx + j]
+            h_name = year_cal["holiday_name"][first_idx + j]
+            color = "#FFE6F0" if h_name else "#f1f5f9" if is_weekend else "transparent"
+            p0, p1 = 100 * (j - a) / span, 100 * (j - a + 1) / span
+            if stops and stops[-1][0] == color:
+                stops[-1][2] = p1
+            else:
+                stops.append([color, p0, p1])
+            if dates_m[j] == TODAY:
+                icons += f'<div class="run-today" style="left:{p0:.3f}%;width:{p1 - p0:.3f}%"></div>'
+            if h_name and not is_weekend and show_holiday:
+                icons += f'<span style="left:{p0:.3f}%;width:{p1 - p0:.3f}%">🎉</span>'
+        if len(stops) == 1 and stops[0][0] == "transparent" and not icons:
+            return ""
+        gradient = ", ".join(f"{c} {p0:.3f}% {p1:.3f}%" for c, p0, p1 in stops)
+        return f'<div class="run-marks" style="background:linear-gradient(to right, {gradient})">{icons}</div>'
+    
+    # Construction du tableau HTML d'un mois (une cellule par jour, ou par suite de jours en mode barres)
+    def render_month_html(m, bars=False):
+        events_index, index_events = get_events_index()
+        days_in_m = calendar.monthrange(sel_year, m)[1]
+        dates_m = [date(sel_year, m, d) for d in range(1, days_in_m + 1)]
+        # Position du 1er du mois dans le calendrier de l'année
+        first_idx = day_index(year_cal, dates_m[0])
+        
+        # CONSTRUCTION TABLEAU
+        html = f'<div class="planning-wrap"><table class="planning-table"><thead><tr><th class="app-header">Application</th>'
+        
+        # En-têtes des jours
+        for j, d in enumerate(dates_m):
+            th_c = "today-header" if d == TODAY else ""
+            day_l = ["L","M","M","J","V","S","D"][year_cal["weekday"][first_idx + j]]
+            html += f'<th class="{th_c}">{d.day}<br>{day_l}</th>'
+        html += '</tr></thead><tbody>'
+
+        # Contenu des tooltips : une seule fois par événement (et par férié), référencé par les cellules
+        rows_html = ""
+        for app_n in st.session_state.apps:
+            # Événements de la ligne qui chevauchent le mois (avec filtre projet si RECETTE)
+            row_events = [
+                ev for ev in get_events_in_range(events_index, index_events, env_sel, app_n, dates_m[0], dates_m[-1])
+                if should_show_event(ev, env_sel, projet_filter)
+            ]
+            tooltip_events = {}
+            tooltip_holidays = {}
+            cells_html = ""
             
-            # En-têtes des jours
-            for d in dates_m:
-                th_c = "today-header" if d == TODAY else ""
-                day_l = ["L","M","M","J","V","S","D"][d.weekday()]
-                html += f'<th class="{th_c}">{d.day}<br>{day_l}</th>'
-            html += '</tr></thead><tbody>'
-
-            for app_n in st.session_state.apps:
-                html += f'<tr><td class="app-name">{app_n}</td>'
-                
-                for d in dates_m:
+            # Références vers les tooltips des événements (construits à la première cellule rencontrée)
+            def tooltip_refs(matching_events, holiday_days):
+                refs = []
+                for ev in matching_events:
+                    ref = f"e{ev['id']}"
+                    if ref not in tooltip_events:
+                        tooltip_events[ref] = event_tooltip_html(ev)
+                    refs.append(ref)
+                # Ajouter info férié si applicable
+                for j in holiday_days:
+                    ref = f"h{j}"
+                    tooltip_holidays[ref] = f'<span class="tooltip-label">🎉 Férié:</span> {year_cal["holiday_name"][first_idx + j]}'
+                    refs.append(ref)
+                return " ".join(refs)
+            
+            if bars:
+                for a, b, run_events in row_runs(row_events, len(dates_m), dates_m[0]):
+                    marks = run_marks_html(dates_m, first_idx, a, b, show_holiday=not run_events)
+                    if run_events:
+                        holiday_days = [j for j in range(a, b) if year_cal["holiday_name"][first_idx + j]]
+                        cells_html += (f'<td colspan="{b - a}" class="event-run has-tooltip" '
+                                       f'data-tt="{tooltip_refs(run_events, holiday_days)}">'
+                                       f'{events_content_html(run_events)}{marks}</td>')
+                    else:
+                        cells_html += f'<td colspan="{b - a}">{marks}</td>'
+            else:
+                for j, d in enumerate(dates_m):
                     td_class = []
                     content = ""
-                    tooltip_html = ""
+                    is_weekend = year_cal["weekend"][first_idx + j]
                     
                     # Styles de base
                     if d == TODAY: 
                         td_class.append("today-col")
-                    if d.weekday() >= 5: 
+                    if is_weekend: 
                         td_class.append("weekend")
                     
                     # Vérifier jour férié
-                    h_name = fr_holidays.get(d)
+                    h_name = year_cal["holiday_name"][first_idx + j]
                     if h_name:
                         td_class.append("ferie")
-                        if d.weekday() < 5:
+                        if not is_weekend:
                             content = "🎉"
                     
-                    # Collecter les événements qui couvrent ce jour (avec filtre projet si RECETTE)
-                    matching_events = []
-                    for ev in st.session_state.events:
-                        if ev["app"] == app_n and should_show_event(ev, env_sel, projet_filter):
-                            if ev["d1"] <= d <= ev["d2"]:
-                                matching_events.append(ev)
+                    # Collecter les événements qui couvrent ce jour
+                    matching_events = [ev for ev in row_events if ev["d1"] <= d <= ev["d2"]]
                     
                     # Si des événements sont trouvés pour ce jour
                     if matching_events:
-                        if len(matching_events) == 1:
-                            # UN SEUL événement - affichage classique
-                            ev = matching_events[0]
-                            t_cls = get_event_class(ev["type"])
-                            t_raw = str(ev["type"]).upper()
-                            content = f'<div class="event-cell {t_cls}">{t_raw[:3]}</div>'
-                        else:
-                            # PLUSIEURS événements - affichage en bandes
-                            content = '<div class="multi-event">'
-                            for ev in matching_events:
-                                t_cls = get_event_class(ev["type"])
-                                t_raw = str(ev["type"]).upper()
-                                content += f'<div class="event-band bg-{t_cls}">{t_raw[:3]}</div>'
-                            content += '</div>'
-                        
-                        # Construction du tooltip avec TOUS les événements
-                        tooltip_parts = []
-                        for idx, ev in enumerate(matching_events):
-                            dur = (ev["d2"] - ev["d1"]).days + 1
-                            comment_text = str(ev.get('comment', '-')).replace('<', '&lt;').replace('>', '&gt;')
-                            projet_text = ev.get('projet') if ev.get('projet') and ev.get('projet') != "" else None
-                            
-                            separator = '<div class="tooltip-separator"></div>' if idx > 0 else ''
-                            
-                            projet_line = f'<span class="tooltip-label">📁 Projet:</span> {projet_text}<br>' if projet_text else ''
-                            
-                            tooltip_parts.append(f'''{separator}
-<strong style="color:#60a5fa; font-size:13px; display:block; margin-bottom:8px;">📋 {ev['type']}</strong>
-<span class="tooltip-label">📱 App:</span> {ev['app']}<br>
-{projet_line}<span class="tooltip-label">⏰ Heures:</span> {ev.get('h1','00:00')} - {ev.get('h2','23:59')}<br>
-<span class="tooltip-label">📅 Dates:</span> {ev['d1'].strftime('%d/%m')} au {ev['d2'].strftime('%d/%m')}<br>
-<span class="tooltip-label">⏱️ Durée:</span> {dur} jour(s)<br>
-<span class="tooltip-label">💬 Note:</span> {comment_text if comment_text and comment_text != '-' else '<i>Aucune</i>'}''')
-                        
-                        # Ajouter info férié si applicable
-                        if h_name:
-                            tooltip_parts.append(f'<br><span class="tooltip-label">🎉 Férié:</span> {h_name}')
-                        
-                        tooltip_content = f'''<div class="tooltip-box">{''.join(tooltip_parts)}</div>'''
-                        
-                        # Assemblage de la cellule avec tooltip
+                        content = events_content_html(matching_events)
+                        refs = tooltip_refs(matching_events, [j] if h_name else [])
+                    
+                        # Cellule avec tooltip référencé
                         class_str = " ".join(td_class) if td_class else ""
-                        html += f'<td class="{class_str} has-tooltip">{content}{tooltip_content}</td>'
+                        cells_html += f'<td class="{class_str} has-tooltip" data-tt="{refs}">{content}</td>'
                     else:
                         # Cellule sans événement
                         class_str = " ".join(td_class) if td_class else ""
-                        html += f'<td class="{class_str}">{content}</td>'
-                
-                html += '</tr>'
+                        cells_html += f'<td class="{class_str}">{content}</td>'
             
-            html += '</tbody></table></div>'
-            st.markdown(html, unsafe_allow_html=True)
+            # Pile (masquée) des tooltips de la ligne, lue par le script des tooltips
+            stack = "".join(f'<div class="tt-{ref}">{part}</div>'
+                            for ref, part in {**tooltip_events, **tooltip_holidays}.items())
+            if stack:
+                stack = f'<div class="tooltip-stack">{stack}</div>'
+            rows_html += f'<tr><td class="app-name">{app_n}{stack}</td>{cells_html}</tr>'
+        
+        html += rows_html
+        html += '</tbody></table></div>'
+        return html
+
+    # Données compactes d'un mois pour la grille virtualisée
+    def build_grid_payload(m):
+        events_index, index_events = get_events_index()
+        days_in_m = calendar.monthrange(sel_year, m)[1]
+        start, end = date(sel_year, m, 1), date(sel_year, m, days_in_m)
+        first_idx = day_index(year_cal, start)
+        
+        # Jours : [numéro, jour de semaine, week-end, nom du férié, aujourd'hui]
+        days = []
+        for j in range(days_in_m):
+            d = start + timedelta(days=j)
+            days.append([d.day, int(year_cal["weekday"][first_idx + j]), bool(year_cal["weekend"][first_idx + j]),
+                         year_cal["holiday_name"][first_idx + j] or "", d == TODAY])
+        
+        # Chaque événement n'est envoyé qu'une fois ; les lignes référencent sa position
+        events, positions, rows = [], {}, []
+        for app_n in st.session_state.apps:
+            spans = []
+            for ev in get_events_in_range(events_index, index_events, env_sel, app_n, start, end):
+                if not should_show_event(ev, env_sel, projet_filter):
+                    continue
+                key = ev["id"]
+                if key not in positions:
+                    positions[key] = len(events)
+                    t_raw = str(ev["type"]).upper()
+                    events.append([
+                        get_event_class(ev["type"]), t_raw[:3], str(ev["type"]), str(ev["app"]),
+                        ev.get("projet") or "", ev.get("h1", "00:00"), ev.get("h2", "23:59"),
+                        ev["d1"].strftime("%d/%m"), ev["d2"].strftime("%d/%m"), (ev["d2"] - ev["d1"]).days + 1,
+                        str(ev.get("comment", "-")), ev["id"] in conflict_ids,
+                    ])
+                spans.append([positions[key], max((ev["d1"] - start).days, 0), min((ev["d2"] - start).days, days_in_m - 1)])
+            rows.append(spans)
+        return {"days": days, "apps": list(st.session_state.apps), "events": events, "rows": rows}
+
+    # HTML mis en cache selon les entrées du rendu + version des données
+    def month_html(m):
+        key = (sel_year, m, env_sel, projet_filter, bars_mode, tuple(st.session_state.apps),
+               st.session_state.get("data_version", 0), TODAY)
+        return get_month_html(key, lambda: render_month_html(m, bars=bars_mode))
+
+    if not st.session_state.apps:
+        st.info("Aucune application enregistrée.")
+    elif view_mode == "🗓️ Année":
+        # Événements affichés (secteur + filtre projet), en colonnes
+        frame, _ = get_events_frame()
+        shown = events_mask(frame, env=env_sel)
+        if env_sel == "RECETTE" and projet_filter not in (None, "📋 Afficher tout"):
+            no_projet = events_mask(frame, no_projet=True)
+            if projet_filter == "📋 Afficher tout (hors projet)":
+                shown &= no_projet
+            else:
+                shown &= no_projet | events_mask(frame, projet=projet_filter)
+        
+        # Classe de chaque type calculée une fois par catégorie (dernier élément : type manquant)
+        categories = list(frame["type"].cat.categories) + [None]
+        category_classes = np.array([TYPE_CLASSES.index(get_event_class(t)) for t in categories])
+        ev_classes = category_classes[frame["type"].cat.codes.to_numpy()[shown]]
+        
+        counts, dominant = compute_year_occupancy(
+            st.session_state.apps, frame["app"].to_numpy()[shown], ev_classes,
+            frame["d1"].to_numpy()[shown], frame["d2"].to_numpy()[shown],
+            year_cal["first"], len(year_cal["weekday"]))
+        st.caption("ℹ️ Couleur = type d'événement dominant du jour, intensité = nombre d'événements. "
+                   "Cliquer sur une cellule ouvre le mois correspondant.")
+        chart_event = st.altair_chart(year_heatmap_chart(st.session_state.apps, counts, dominant, year_cal["first"]),
+                                      use_container_width=True, on_select="rerun", key="planning_year_chart")
+        
+        clicked = chart_event.selection.get("cellule") if chart_event else None
+        if clicked:
+            st.session_state.nav_to_month = int(clicked[0]["mois"]) - 1
+            st.session_state.nav_to_view = "📋 Tableau"
+            st.rerun()
+    elif view_mode == "🚀 Grille virtualisée":
+        month_sel = st.radio("Mois :", MONTHS_FR, horizontal=True, key="planning_month", label_visibility="collapsed")
+        render_virtual_grid(build_grid_payload(MONTHS_FR.index(month_sel) + 1))
+    elif lazy_mode:
+        install_planning_tooltips()
+        # Un seul mois rendu par rerun
+        month_sel = st.radio("Mois :", MONTHS_FR, horizontal=True, key="planning_month", label_visibility="collapsed")
+        st.markdown(month_html(MONTHS_FR.index(month_sel) + 1), unsafe_allow_html=True)
+    else:
+        install_planning_tooltips()
+        for i, tab in enumerate(st.tabs(MONTHS_FR)):
+            with tab:
+                st.markdown(month_html(i + 1), unsafe_allow_html=True)
 
 elif st.session_state.page == "dashboard":
     st.title("📊 Dashboard Disponibilité - Environnement RECETTE")
@@ -1104,91 +2806,55 @@ elif st.session_state.page == "dashboard":
         with col_period1:
             years_list = [2026, 2027, 2028, 2029, 2030]
             dash_year = st.selectbox("📅 Année", years_list, index=years_list.index(TODAY.year) if TODAY.year in years_list else 0, key="dash_year")
+            ensure_events_year(dash_year)
         
         with col_period2:
             period_options = ["Année complète"] + MONTHS_FR
             dash_period = st.selectbox("📆 Période", period_options, key="dash_period")
         
+        # Précision horaire : heures des événements comptées dans la plage ouvrée des jours ouvrés
+        hour_mode = st.toggle("⏱️ Précision horaire", key="dash_hours",
+                              help=f"Disponibilité en heures ouvrées ({BUSINESS_HOURS[0] // 60:02d}:{BUSINESS_HOURS[0] % 60:02d}"
+                                   f"-{BUSINESS_HOURS[1] // 60:02d}:{BUSINESS_HOURS[1] % 60:02d}) selon les heures de début et de fin")
+        
         st.divider()
         
-        # Charger les jours fériés
-        fr_holidays = holidays.France(years=dash_year)
+        # Calendrier précalculé de l'année (jours ouvrés = lun-ven hors fériés)
+        year_cal = get_year_calendar(dash_year)
         
-        # Fonction pour calculer les jours ouvrés d'une période
-        def get_working_days(year, month=None):
-            """Retourne la liste des jours ouvrés (lun-ven, hors fériés)"""
-            working_days = []
-            if month:
-                # Un mois spécifique
-                days_in_month = calendar.monthrange(year, month)[1]
-                for day in range(1, days_in_month + 1):
-                    d = date(year, month, day)
-                    if d.weekday() < 5 and d not in fr_holidays:  # Lun-Ven et pas férié
-                        working_days.append(d)
-            else:
-                # Année complète
-                for m in range(1, 13):
-                    days_in_month = calendar.monthrange(year, m)[1]
-                    for day in range(1, days_in_month + 1):
-                        d = date(year, m, day)
-                        if d.weekday() < 5 and d not in fr_holidays:
-                            working_days.append(d)
-            return working_days
-        
-        # Fonction pour vérifier si un événement doit être pris en compte
-        def should_count_event(ev):
-            # Environnement RECETTE uniquement
-            if ev.get("env") != "RECETTE":
-                return False
-            
-            # Type MAINTENANCE ou INCIDENT uniquement
-            ev_type = str(ev.get("type", "")).upper()
-            if "MAI" not in ev_type and "INC" not in ev_type:
-                return False
-            
-            return True
+        # Événements pris en compte : environnement RECETTE, type MAINTENANCE ou INCIDENT
+        events_frame, frame_events = get_events_frame()
+        counted_types = [t for t in events_frame["type"].cat.categories if "MAI" in str(t).upper() or "INC" in str(t).upper()]
+        counted_mask = events_mask(events_frame, env="RECETTE") & events_frame["type"].isin(counted_types).to_numpy()
+        counted = events_frame[counted_mask]
         
         # Déterminer la période
         if dash_period == "Année complète":
-            working_days = get_working_days(dash_year)
             period_label = f"Année {dash_year}"
+            period_start, period_end = date(dash_year, 1, 1), date(dash_year, 12, 31)
         else:
             month_idx = MONTHS_FR.index(dash_period) + 1
-            working_days = get_working_days(dash_year, month_idx)
             period_label = f"{dash_period} {dash_year}"
+            period_start = date(dash_year, month_idx, 1)
+            period_end = date(dash_year, month_idx, calendar.monthrange(dash_year, month_idx)[1])
         
-        total_working_days = len(working_days)
+        total_working_days = working_days_between(year_cal, period_start, period_end)
         
         if total_working_days == 0:
             st.warning("⚠️ Aucun jour ouvré sur cette période.")
         else:
-            # Calculer la disponibilité par application
-            results = []
-            
-            for app_name in st.session_state.apps:
-                # Trouver les jours avec incident ou maintenance pour cette app
-                unavailable_days = set()
-                
-                for ev in st.session_state.events:
-                    if ev.get("app") == app_name and should_count_event(ev):
-                        # Parcourir tous les jours de l'événement
-                        current = ev["d1"]
-                        while current <= ev["d2"]:
-                            if current in working_days:
-                                unavailable_days.add(current)
-                            current += timedelta(days=1)
-                
-                nb_unavailable = len(unavailable_days)
-                nb_available = total_working_days - nb_unavailable
-                availability = (nb_available / total_working_days) * 100 if total_working_days > 0 else 100
-                
-                results.append({
-                    "app": app_name,
-                    "total": total_working_days,
-                    "unavailable": nb_unavailable,
-                    "available": nb_available,
-                    "availability": availability
-                })
+            # Calculer la disponibilité de toutes les applications (jours ouvrés sous forme de masque)
+            working_mask = year_cal["working"][day_index(year_cal, period_start):day_index(year_cal, period_end) + 1]
+            if hour_mode:
+                # Créneaux parsés une fois par table (pas de relecture des heures à chaque rerun)
+                ev_starts, ev_ends = get_events_intervals(events_frame)
+                results = compute_availability_hours(st.session_state.apps, counted["app"].to_numpy(), ev_starts[counted_mask],
+                                                     ev_ends[counted_mask], period_start, working_mask)
+                fmt = lambda v: f"{v:.1f} h"
+            else:
+                results = compute_availability(st.session_state.apps, counted["app"].to_numpy(), counted["d1"].to_numpy(),
+                                               counted["d2"].to_numpy(), period_start, working_mask)
+                fmt = str
             
             # Calculer la moyenne globale
             avg_availability = sum(r["availability"] for r in results) / len(results) if results else 0
@@ -1204,12 +2870,16 @@ elif st.session_state.page == "dashboard":
                 st.caption(f"{color} {'Excellent' if avg_availability >= 95 else 'Correct' if avg_availability >= 80 else 'Critique'}")
             
             with col_m2:
-                st.metric("Jours ouvrés", f"{total_working_days}")
-                st.caption("Lun-Ven hors fériés")
+                if hour_mode:
+                    st.metric("Heures ouvrées", fmt(results[0]["total"]) if results else "0")
+                    st.caption(f"{total_working_days} jours ouvrés (Lun-Ven hors fériés)")
+                else:
+                    st.metric("Jours ouvrés", f"{total_working_days}")
+                    st.caption("Lun-Ven hors fériés")
             
             with col_m3:
                 total_incidents = sum(r["unavailable"] for r in results)
-                st.metric("Total jours impactés", f"{total_incidents}")
+                st.metric("Total heures impactées" if hour_mode else "Total jours impactés", fmt(total_incidents))
                 st.caption("Maintenance + Incident")
             
             with col_m4:
@@ -1227,7 +2897,7 @@ elif st.session_state.page == "dashboard":
             with header_col1:
                 st.markdown("**Application**")
             with header_col2:
-                st.markdown("<div style='text-align:center'><strong>Jours ouvrés</strong></div>", unsafe_allow_html=True)
+                st.markdown(f"<div style='text-align:center'><strong>{'Heures ouvrées' if hour_mode else 'Jours ouvrés'}</strong></div>", unsafe_allow_html=True)
             with header_col3:
                 st.markdown("<div style='text-align:center'><strong>Indispo.</strong></div>", unsafe_allow_html=True)
             with header_col4:
@@ -1269,11 +2939,11 @@ elif st.session_state.page == "dashboard":
                 with col1:
                     st.markdown(f"**{r['app']}**")
                 with col2:
-                    st.markdown(f"<div style='text-align:center'>{r['total']}</div>", unsafe_allow_html=True)
+                    st.markdown(f"<div style='text-align:center'>{fmt(r['total'])}</div>", unsafe_allow_html=True)
                 with col3:
-                    st.markdown(f"<div style='text-align:center; color:#dc2626;'>{r['unavailable']}</div>", unsafe_allow_html=True)
+                    st.markdown(f"<div style='text-align:center; color:#dc2626;'>{fmt(r['unavailable'])}</div>", unsafe_allow_html=True)
                 with col4:
-                    st.markdown(f"<div style='text-align:center; color:#16a34a;'>{r['available']}</div>", unsafe_allow_html=True)
+                    st.markdown(f"<div style='text-align:center; color:#16a34a;'>{fmt(r['available'])}</div>", unsafe_allow_html=True)
                 with col5:
                     st.progress(avail / 100)
                     st.caption(f"{avail:.1f}%")
@@ -1298,18 +2968,17 @@ elif st.session_state.page == "dashboard":
             
             # Filtrer les événements de la période
             events_in_period = []
-            for ev in st.session_state.events:
-                if should_count_event(ev):
-                    # Vérifier si l'événement chevauche la période
-                    if dash_period == "Année complète":
-                        if ev["d1"].year == dash_year or ev["d2"].year == dash_year:
-                            events_in_period.append(ev)
-                    else:
-                        month_idx = MONTHS_FR.index(dash_period) + 1
-                        ev_start_month = ev["d1"].month if ev["d1"].year == dash_year else 0
-                        ev_end_month = ev["d2"].month if ev["d2"].year == dash_year else 13
-                        if ev_start_month <= month_idx <= ev_end_month or ev_end_month >= month_idx >= ev_start_month:
-                            events_in_period.append(ev)
+            for ev in (frame_events[pos] for pos in np.flatnonzero(counted_mask)):
+                # Vérifier si l'événement chevauche la période
+                if dash_period == "Année complète":
+                    if ev["d1"].year == dash_year or ev["d2"].year == dash_year:
+                        events_in_period.append(ev)
+                else:
+                    month_idx = MONTHS_FR.index(dash_period) + 1
+                    ev_start_month = ev["d1"].month if ev["d1"].year == dash_year else 0
+                    ev_end_month = ev["d2"].month if ev["d2"].year == dash_year else 13
+                    if ev_start_month <= month_idx <= ev_end_month or ev_end_month >= month_idx >= ev_start_month:
+                        events_in_period.append(ev)
             
             if events_in_period:
                 # Créer un DataFrame pour affichage
@@ -1325,3 +2994,12 @@ elif st.session_state.page == "dashboard":
                 st.dataframe(df_events, use_container_width=True, hide_index=True)
             else:
                 st.success("✅ Aucun incident ou maintenance sur cette période !")
+
+# ==================================================
+# 5. SUIVI DES ÉCRITURES EN ARRIÈRE-PLAN
+# ==================================================
+# Appelé après le rendu de la page : la relance déclenchée à la fin d'une écriture
+# n'interrompt pas le script avant ses widgets (leur état serait perdu).
+if st.session_state.pending_writes:
+    with write_status_box:
+        pending_writes_status()
@@ -0,0 +1,29 @@
+-- Colonne updated_at utilisée par le rafraîchissement incrémental (watermark par table).
+-- À exécuter une fois dans l'éditeur SQL de Supabase.
+
+create or replace function set_updated_at() returns trigger as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$ language plpgsql;
+
+alter table applications add column if not exists updated_at timestamptz not null default now();
+alter table projets add column if not exists updated_at timestamptz not null default now();
+alter table evenements add column if not exists updated_at timestamptz not null default now();
+
+drop trigger if exists applications_updated_at on applications;
+create trigger applications_updated_at before insert or update on applications
+    for each row execute function set_updated_at();
+
+drop trigger if exists projets_updated_at on projets;
+create trigger projets_updated_at before insert or update on projets
+    for each row execute function set_updated_at();
+
+drop trigger if exists evenements_updated_at on evenements;
+create trigger evenements_updated_at before insert or update on evenements
+    for each row execute function set_updated_at();
+
+-- Lectures « modifié depuis » et par année
+create index if not exists evenements_updated_at_idx on evenements (updated_at);
+create index if not exists evenements_dates_idx on evenements (d1, d2);
@@ -0,0 +1,20 @@
+-- Colonne search utilisée par la recherche du mode paginé (fetch_events_page) :
+-- mêmes champs que l'index en mémoire (comment, app, projet, type), en minuscules et sans accents.
+-- À exécuter une fois dans l'éditeur SQL de Supabase.
+
+create extension if not exists unaccent with schema extensions;
+
+-- unaccent n'est pas déclarée immutable : enveloppe utilisable dans une colonne générée
+create or replace function immutable_unaccent(text) returns text as $$
+    select extensions.unaccent('extensions.unaccent', $1)
+$$ language sql immutable parallel safe strict;
+
+alter table evenements add column if not exists search tsvector
+    generated always as (
+        to_tsvector('simple', immutable_unaccent(
+            coalesce(comment, '') || ' ' || coalesce(app, '') || ' ' || coalesce(projet, '') || ' ' || coalesce(type, '')
+        ))
+    ) stored;
+
+-- Recherche par préfixe (mot:*) sur tous les mots
+create index if not exists evenements_search_idx on evenements using gin (search);
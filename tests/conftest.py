@@ -0,0 +1,32 @@
+"""Chargement des fonctions de app.py pour les tests, sans exécuter le script Streamlit
+
+app.py est un script : seuls les imports, les constantes (NOMS_EN_MAJUSCULES), les classes
+et les fonctions de premier niveau sont exécutés, dans l'ordre du fichier.
+"""
+import ast
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+def is_definition(node):
+    """Nœud de premier niveau sans effet sur la page (import, constante, classe ou fonction)"""
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+        return True
+    return isinstance(node, ast.Assign) and all(
+        isinstance(target, ast.Name) and target.id.isupper() for target in node.targets)
+
+def load_app():
+    """Module contenant les définitions de app.py"""
+    tree = ast.parse(APP_PATH.read_text(encoding="utf-8"), filename=str(APP_PATH))
+    tree.body = [node for node in tree.body if is_definition(node)]
+    module = ModuleType("planning_app")
+    module.__file__ = str(APP_PATH)
+    exec(compile(tree, str(APP_PATH), "exec"), module.__dict__)
+    return module
+
+@pytest.fixture(scope="session")
+def app():
+    return load_app()
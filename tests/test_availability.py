@@ -0,0 +1,86 @@
+"""Disponibilité du dashboard : comparaison avec un calcul jour par jour"""
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+APPS = ["APP00", "APP01", "APP02", "APP03"]
+
+def random_events(rnd, period_start, n_days, n_events):
+    """Événements tirés autour de la période (certains la débordent ou sont hors période)"""
+    events = []
+    for _ in range(n_events):
+        d1 = period_start + timedelta(days=rnd.randint(-10, n_days + 5))
+        d2 = d1 + timedelta(days=rnd.choice([-1, 0, 0, 1, 3, 15]))
+        events.append((rnd.choice(APPS + ["INCONNUE"]), d1, d2))
+    return events
+
+def test_compute_availability_matches_brute_force(app):
+    rnd = random.Random(10)
+    for _ in range(200):
+        period_start = date(2026, 1, 1) + timedelta(days=rnd.randint(0, 300))
+        n_days = rnd.randint(1, 40)
+        working_mask = np.array([rnd.random() < 0.7 for _ in range(n_days)])
+        events = random_events(rnd, period_start, n_days, rnd.randint(0, 25))
+        apps = rnd.sample(APPS, rnd.randint(1, len(APPS)))
+        
+        results = app.compute_availability(
+            apps, np.array([e[0] for e in events], dtype=object),
+            np.array([e[1] for e in events], dtype="datetime64[D]"),
+            np.array([e[2] for e in events], dtype="datetime64[D]"),
+            period_start, working_mask)
+        
+        total = int(working_mask.sum())
+        assert [r["app"] for r in results] == apps
+        for r in results:
+            days = {period_start + timedelta(days=i) for i in range(n_days) if working_mask[i]}
+            unavailable = sum(1 for d in days if any(a == r["app"] and d1 <= d <= d2 for a, d1, d2 in events))
+            assert r["total"] == total
+            assert r["unavailable"] == unavailable
+            assert r["available"] == total - unavailable
+            assert r["availability"] == pytest.approx(100 * (total - unavailable) / total if total else 100)
+
+def test_compute_availability_without_events(app):
+    results = app.compute_availability(["A"], np.array([], dtype=object), np.array([], dtype="datetime64[D]"),
+                                       np.array([], dtype="datetime64[D]"), date(2026, 3, 2), np.array([True] * 5))
+    assert results == [{"app": "A", "total": 5, "unavailable": 0, "available": 5, "availability": 100.0}]
+
+def test_compute_availability_hours_matches_minute_count(app):
+    rnd = random.Random(24)
+    business_hours = (8 * 60, 18 * 60)
+    for _ in range(100):
+        period_start = date(2026, 5, 1) + timedelta(days=rnd.randint(0, 30))
+        n_days = rnd.randint(1, 8)
+        working_mask = np.array([rnd.random() < 0.7 for _ in range(n_days)])
+        origin = np.datetime64(period_start, "m")
+        events = []
+        for _ in range(rnd.randint(0, 12)):
+            start = origin + np.timedelta64(rnd.randint(-2 * 1440, (n_days + 1) * 1440), "m")
+            events.append((rnd.choice(APPS + ["INCONNUE"]), start, start + np.timedelta64(rnd.randint(1, 3 * 1440), "m")))
+        apps = rnd.sample(APPS, rnd.randint(1, len(APPS)))
+        
+        results = app.compute_availability_hours(
+            apps, np.array([e[0] for e in events], dtype=object),
+            np.array([e[1] for e in events], dtype="datetime64[m]"), np.array([e[2] for e in events], dtype="datetime64[m]"),
+            period_start, working_mask, business_hours)
+        
+        # Minutes ouvrées de la période, puis minutes couvertes par au moins un créneau de l'application
+        minute = np.arange(n_days * 1440)
+        open_minutes = working_mask[minute // 1440] & (minute % 1440 >= business_hours[0]) & (minute % 1440 < business_hours[1])
+        total = open_minutes.sum() / 60
+        for r in results:
+            covered = np.zeros(n_days * 1440, dtype=bool)
+            for a, start, end in events:
+                if a == r["app"]:
+                    covered[max(int((start - origin).astype(int)), 0):max(int((end - origin).astype(int)), 0)] = True
+            unavailable = (covered & open_minutes).sum() / 60
+            assert r["total"] == pytest.approx(total)
+            assert r["unavailable"] == pytest.approx(unavailable)
+            assert r["available"] == pytest.approx(total - unavailable)
+
+def test_hour_minutes_rejects_out_of_range_values(app):
+    values = ["08:30", "7:05", " 9 : 5 ", "23:59", "24:00", "25:99", "12:60", "-1:00", "8h", "", None]
+    expected = [510, 425, 545, 1439, -1, -1, -1, -1, -1, -1, -1]
+    assert [app.hour_minutes(v, -1) for v in values] == expected
+    assert app.hour_minutes_column(values, -1).tolist() == expected
@@ -0,0 +1,45 @@
+"""Détection des conflits : balayage comparé à la comparaison de toutes les paires"""
+import random
+from datetime import date, timedelta
+
+TYPES = ["MEP", "INCIDENT", "MAINTENANCE", "TEST", "TNR", "MORATOIRE"]
+
+def random_event(rnd, event_id):
+    d1 = date(2026, 5, 1) + timedelta(days=rnd.randint(0, 6))
+    return {
+        "id": event_id, "app": rnd.choice(["APP00", "APP01"]), "env": rnd.choice(["PROD", "RECETTE"]),
+        "type": rnd.choice(TYPES), "d1": d1, "d2": d1 + timedelta(days=rnd.choice([0, 0, 1, 3])),
+        "h1": rnd.choice([None, "00:00", "08:00", "12:30", "25:99"]), "h2": rnd.choice([None, "09:00", "18:00", "23:59"]),
+    }
+
+def conflicts_all_pairs(app, items):
+    pairs = set()
+    for i, (a, a_candidate) in enumerate(items):
+        for b, b_candidate in items[i + 1:]:
+            (a1, a2), (b1, b2) = app.event_interval(a), app.event_interval(b)
+            if ((a["app"], a["env"]) == (b["app"], b["env"]) and a1 < b2 and b1 < a2 and (a_candidate or b_candidate)
+                    and frozenset((app.get_event_class(a["type"]), app.get_event_class(b["type"]))) in app.CONFLICT_RULES):
+                pairs.add(frozenset((a["id"], b["id"])))
+    return pairs
+
+def test_sweep_conflicts_matches_all_pairs(app):
+    rnd = random.Random(23)
+    for _ in range(300):
+        items = [(random_event(rnd, i), rnd.random() < 0.4) for i in range(rnd.randint(0, 15))]
+        pairs = app.sweep_conflicts(items)
+        found = [frozenset((a["id"], b["id"])) for a, b in pairs]
+        assert len(found) == len(set(found))
+        assert set(found) == conflicts_all_pairs(app, items)
+
+def test_adjacent_slots_do_not_conflict(app):
+    # La minute de fin est incluse : 08:00-09:59 puis 10:00-11:00 se suivent sans se chevaucher
+    a = {"id": 1, "app": "A", "env": "PROD", "type": "MEP", "d1": date(2026, 5, 4), "d2": date(2026, 5, 4), "h1": "08:00", "h2": "09:59"}
+    b = {**a, "id": 2, "h1": "10:00", "h2": "11:00"}
+    assert app.find_conflicts([b], [a]) == []
+    assert app.find_conflicts([{**b, "h1": "09:59"}], [a]) == [(a, {**b, "h1": "09:59"})]
+
+def test_existing_events_are_not_compared_with_each_other(app):
+    a = {"id": 1, "app": "A", "env": "PROD", "type": "MEP", "d1": date(2026, 5, 4), "d2": date(2026, 5, 4)}
+    b = {**a, "id": 2}
+    c = {**a, "id": 3, "app": "B"}
+    assert app.find_conflicts([c], [a, b]) == []
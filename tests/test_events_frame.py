@@ -0,0 +1,50 @@
+"""Table colonnaire des événements : correction incrémentale comparée à une reconstruction"""
+import itertools
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+
+def random_event(rnd, event_id):
+    d1 = date(2026, 1, 1) + timedelta(days=rnd.randint(0, 364))
+    return {
+        "id": event_id, "app": rnd.choice(["APP00", "APP01", "APP02", "NOUVELLE"]),
+        "env": rnd.choice(["PROD", "PRÉPROD", "RECETTE"]), "type": rnd.choice(["MEP", "INCIDENT", "TEST"]),
+        "projet": rnd.choice([None, "ALPHA", "BETA", "GAMMA"]), "d1": d1, "d2": d1 + timedelta(days=rnd.randint(0, 5)),
+        "h1": "08:00", "h2": rnd.choice(["18:00", "23:59"]), "comment": rnd.choice(["", "maj", "INC-64"]),
+    }
+
+def assert_same_frame(app, frame, expected):
+    assert list(frame.columns) == app.EVENT_COLUMNS
+    assert len(frame) == len(expected)
+    for col in app.EVENT_COLUMNS:
+        if col in app.CATEGORY_COLUMNS:
+            assert isinstance(frame[col].dtype, pd.CategoricalDtype), col
+        assert frame[col].astype(object).tolist() == expected[col].astype(object).tolist(), col
+
+def test_patch_events_frame_matches_rebuild(app):
+    rnd = random.Random(12)
+    ids = itertools.count(1)
+    events = tuple(random_event(rnd, next(ids)) for _ in range(50))
+    frame = app.build_events_frame(events)
+    for _ in range(100):
+        # Même enchaînement que patch_events : suppressions, modifications puis ajouts en fin de table
+        existing = [ev["id"] for ev in events]
+        deleted_ids = set(rnd.sample(existing, min(len(existing), rnd.randint(0, 3))))
+        kept_ids = [event_id for event_id in existing if event_id not in deleted_ids]
+        updated = {event_id: {k: v for k, v in random_event(rnd, event_id).items() if k != "id" and rnd.random() < 0.5}
+                   for event_id in rnd.sample(kept_ids, min(len(kept_ids), rnd.randint(0, 4)))}
+        added = [random_event(rnd, next(ids)) for _ in range(rnd.randint(0, 3))]
+        events = tuple(
+            {**ev, **updated[ev["id"]]} if ev["id"] in updated else ev
+            for ev in events if ev["id"] not in deleted_ids
+        ) + tuple(added)
+        
+        frame = app.patch_events_frame(frame, events, added, updated, deleted_ids)
+        assert_same_frame(app, frame, app.build_events_frame(events))
+
+def test_patch_events_frame_from_empty_table(app):
+    rnd = random.Random(1)
+    added = [random_event(rnd, 1), random_event(rnd, 2)]
+    frame = app.patch_events_frame(app.build_events_frame(()), tuple(added), added, {}, set())
+    assert_same_frame(app, frame, app.build_events_frame(added))
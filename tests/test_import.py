@@ -0,0 +1,56 @@
+"""Import de fichiers : résolution, validation et numéros de ligne"""
+import io
+from datetime import date
+
+import pandas as pd
+
+APPS = ["APP01", "APP02", "APPLI ÉTÉ"]
+PROJETS = ["ALPHA"]
+
+class Upload(io.BytesIO):
+    """Fichier envoyé (comme st.file_uploader : name, size)"""
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name, self.size = name, len(data)
+
+def test_prepare_import_chunk_resolves_names_and_reports_lines(app):
+    chunk = pd.DataFrame({
+        "Application": ["app01", "appli ete", "NOPE", None, "APP02", "APP02"],
+        "Environnement": ["preprod", "PROD", "PROD", None, "PROD", "prod"],
+        "Type": ["mep", "Test", "MEP", None, "XXX", "MEP"],
+        "Date début": ["2026-03-02", "05/03/2026", "2026-03-02", None, "2026-03-02", "31/02/2026"],
+        "d2": [None, "06/03/2026", None, None, None, None],
+        "h1": ["08:00", None, None, None, None, None],
+        "Commentaire": [" ok ", None, None, None, None, None],
+        "projet": ["alpha", None, None, None, None, None],
+    })
+    errors, events = app.prepare_import_chunk(chunk, 10, APPS, PROJETS)
+    assert errors == [
+        "⚠️ Ligne 12: Application inconnue : 'NOPE'",
+        "⚠️ Ligne 14: Type inconnu : 'XXX'",
+        "⚠️ Ligne 15: Date début illisible (attendu AAAA-MM-JJ ou JJ/MM/AAAA)",
+    ]
+    assert events == [
+        {"app": "APP01", "env": "PRÉPROD", "type": "MEP", "d1": date(2026, 3, 2), "d2": date(2026, 3, 2),
+         "h1": "08:00", "h2": "23:59", "comment": "ok", "projet": "ALPHA"},
+        {"app": "APPLI ÉTÉ", "env": "PROD", "type": "TEST", "d1": date(2026, 3, 5), "d2": date(2026, 3, 6),
+         "h1": "00:00", "h2": "23:59", "comment": "", "projet": None},
+    ]
+
+def test_prepare_import_chunk_applies_editor_rules(app):
+    chunk = pd.DataFrame({"app": ["APP01", "APP01"], "env": ["PROD", None], "type": ["MEP", "MEP"],
+                          "d1": ["2026-03-05", "2026-03-05"], "d2": ["2026-03-01", None]})
+    errors, events = app.prepare_import_chunk(chunk, 2, APPS, PROJETS)
+    assert errors == ["⚠️ Ligne 2: Date fin avant date début", "⚠️ Ligne 3: Environnement obligatoire"]
+    assert events == []
+
+def test_import_dry_run_keeps_file_line_numbers(app, monkeypatch):
+    monkeypatch.setattr(app, "IMPORT_CHUNK_SIZE", 2)
+    csv = "app;env;type;d1\n\nAPP01;PROD;MEP;2026-03-02\n\n\nNOPE;PROD;MEP;2026-03-02\nAPP01;PROD;MEP;xx\n"
+    stats = app.import_events_file(Upload(csv.encode("utf-8"), "evenements.csv"), APPS, PROJETS, dry_run=True)
+    assert stats["rows"] == 3
+    assert stats["valid"] == 1
+    assert stats["errors"] == [
+        "⚠️ Ligne 6: Application inconnue : 'NOPE'",
+        "⚠️ Ligne 7: Date début illisible (attendu AAAA-MM-JJ ou JJ/MM/AAAA)",
+    ]
@@ -0,0 +1,33 @@
+"""Mode barres du planning : découpage d'une ligne en suites de jours"""
+import random
+from datetime import date, timedelta
+
+def covering(row_events, day):
+    return [ev for ev in row_events if ev["d1"] <= day <= ev["d2"]]
+
+def test_row_runs_groups_days_with_the_same_events(app):
+    rnd = random.Random(16)
+    for _ in range(300):
+        start = date(2026, rnd.randint(1, 12), 1)
+        n_days = rnd.randint(28, 31)
+        # Événements qui chevauchent le mois (comme get_events_in_range), débordements compris
+        row_events = []
+        for i in range(rnd.randint(0, 6)):
+            d1 = start + timedelta(days=rnd.randint(-20, n_days - 1))
+            d2 = max(d1, start) + timedelta(days=rnd.randint(0, 15))
+            row_events.append({"id": i, "d1": d1, "d2": d2})
+        
+        runs = app.row_runs(row_events, n_days, start)
+        
+        # Suites maximales de jours couverts par les mêmes événements, dans l'ordre de la ligne
+        expected = []
+        for j in range(n_days):
+            evs = covering(row_events, start + timedelta(days=j))
+            if expected and expected[-1][2] == evs:
+                expected[-1][1] = j + 1
+            else:
+                expected.append([j, j + 1, evs])
+        assert runs == expected
+
+def test_row_runs_empty_row(app):
+    assert app.row_runs([], 30, date(2026, 4, 1)) == [[0, 30, []]]
@@ -0,0 +1,44 @@
+"""Requêtes Supabase construites par l'application, envoyées à un transport HTTP simulé"""
+import httpx
+import pytest
+from supabase import ClientOptions, create_client
+
+EVENT_ROW = {"id": 7, "app": "APP01", "env": "PROD", "type": "MEP", "projet": None, "d1": "2026-03-02",
+             "d2": "2026-03-02", "h1": "08:00", "h2": "09:00", "comment": "INC-64", "updated_at": "2026-03-01T10:00:00+00:00"}
+
+@pytest.fixture
+def requests(app, monkeypatch):
+    """Requêtes HTTP reçues par un client Supabase dont le transport répond une ligne d'événement"""
+    received = []
+    def handler(request):
+        received.append(request)
+        return httpx.Response(200, json=[EVENT_ROW], headers={"content-range": "0-0/1"})
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    client = create_client("http://supabase.test", "cle-de-test", options=ClientOptions(httpx_client=http_client))
+    monkeypatch.setattr(app, "supabase", app.DataAccess(client, retries=0), raising=False)
+    return received
+
+def test_fetch_events_page_search_is_filtered_ordered_and_paged(app, requests):
+    events, total = app.fetch_events_page({"app": "APP01", "no_projet": True}, 1, 50, "Inc-64 Déploiement")
+    assert total == 1
+    assert [ev["id"] for ev in events] == [7]
+    params = requests[0].url.params
+    assert params["select"] == "id,app,env,type,projet,d1,d2,h1,h2,comment,updated_at"
+    assert params["app"] == "eq.APP01"
+    assert params["or"] == "(projet.is.null,projet.eq.)"
+    assert params["search"] == "fts(simple).inc:* & 64:* & deploiement:*"
+    assert params["order"] == "id.asc"
+    assert (params["offset"], params["limit"]) == ("50", "50")
+
+def test_fetch_events_page_without_search(app, requests):
+    app.fetch_events_page({}, 0, 100, "  ")
+    assert "search" not in requests[0].url.params
+    assert (requests[0].url.params["offset"], requests[0].url.params["limit"]) == ("0", "100")
+
+def test_event_reads_leave_out_the_search_column(app, requests):
+    events = app.fetch_events_year(2026)
+    assert requests[0].url.params["select"] == "id,app,env,type,projet,d1,d2,h1,h2,comment,updated_at"
+    assert (requests[0].url.params["d2"], requests[0].url.params["d1"]) == ("gte.2026-01-01", "lte.2026-12-31")
+    assert events[0]["comment"] == "INC-64"
+    # Ligne complète renvoyée par un ajout : la colonne search n'est pas conservée
+    assert "search" not in app.normalize_event({**EVENT_ROW, "search": "'64':2 'inc':1"})
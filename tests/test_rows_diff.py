@@ -0,0 +1,56 @@
+"""Sauvegarde par différence des applications / projets"""
+import random
+from collections import Counter
+
+def apply_diff(current, inserts, updates, deleted_ids, next_id):
+    """Résultat en base de apply_rows_diff (simulé)"""
+    rows = {row["id"]: dict(row) for row in current if row["id"] not in deleted_ids}
+    for row in updates:
+        assert row["id"] in rows
+        rows[row["id"]].update(row)
+    for row in inserts:
+        rows[next_id] = {"id": next_id, **row}
+        next_id += 1
+    return list(rows.values())
+
+def contents(rows):
+    return Counter(tuple(sorted((f, v) for f, v in row.items() if f != "id")) for row in rows)
+
+def test_diff_rows_reaches_desired_rows(app):
+    rnd = random.Random(18)
+    names = [f"APP{i}" for i in range(8)]
+    for _ in range(300):
+        current = [{"id": i + 1, "nom": nom, "ordre": rnd.randint(1, 5)}
+                   for i, nom in enumerate(rnd.sample(names, rnd.randint(0, 6)))]
+        # Lignes voulues : conservées (id gardé ou perdu), modifiées, ressaisies ou nouvelles
+        desired = []
+        for row in current:
+            if rnd.random() < 0.8:
+                desired.append({"id": rnd.choice([row["id"], None]), "nom": row["nom"],
+                                "ordre": rnd.choice([row["ordre"], rnd.randint(1, 5)])})
+        for nom in rnd.sample(names, rnd.randint(0, 3)):
+            if all(row["nom"] != nom for row in desired):
+                desired.append({"id": None, "nom": nom, "ordre": rnd.randint(1, 5)})
+        rnd.shuffle(desired)
+        
+        inserts, updates, deleted_ids = app.diff_rows(current, desired, "nom")
+        result = apply_diff(current, inserts, updates, deleted_ids, 100)
+        
+        assert contents(result) == contents(desired)
+        # Lignes inchangées : ni envoyées, ni supprimées (elles gardent leur id)
+        by_id = {row["id"]: row for row in current}
+        unchanged = [row for row in current if any(d["nom"] == row["nom"] and d["ordre"] == row["ordre"] for d in desired)]
+        assert all(row["id"] not in deleted_ids for row in unchanged)
+        assert all(by_id[row["id"]] != {**by_id[row["id"]], **row} for row in updates)
+
+def test_diff_rows_matches_by_key_when_id_is_lost(app):
+    current = [{"id": 1, "projet": "ALPHA"}, {"id": 2, "projet": "BETA"}]
+    inserts, updates, deleted_ids = app.diff_rows(current, [{"projet": "BETA"}, {"projet": "GAMMA"}], "projet")
+    assert inserts == [{"projet": "GAMMA"}]
+    assert updates == []
+    assert deleted_ids == [1]
+
+def test_diff_rows_duplicate_names_are_inserted_once_matched(app):
+    current = [{"id": 1, "nom": "APP1", "ordre": 1}]
+    desired = [{"id": 1, "nom": "APP1", "ordre": 1}, {"id": None, "nom": "APP1", "ordre": 2}]
+    assert app.diff_rows(current, desired, "nom") == ([{"nom": "APP1", "ordre": 2}], [], [])
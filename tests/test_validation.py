@@ -0,0 +1,87 @@
+"""Validation des éditeurs : comparaison avec la validation ligne par ligne d'origine"""
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+
+def validate_events_rows(df):
+    """Validation d'origine (boucle iterrows), conservée comme référence"""
+    errors, valid = [], []
+    for idx, r in df.iterrows():
+        if pd.isnull(r.get("app")):
+            continue
+        ligne = idx + 1
+        if pd.isnull(r.get("env")):
+            errors.append(f"⚠️ Ligne {ligne}: Environnement obligatoire")
+            continue
+        if pd.isnull(r.get("type")):
+            errors.append(f"⚠️ Ligne {ligne}: Type obligatoire")
+            continue
+        if pd.isnull(r.get("d1")):
+            errors.append(f"⚠️ Ligne {ligne}: Date début obligatoire")
+            continue
+        d1 = r["d1"]
+        d2 = r["d2"] if pd.notnull(r.get("d2")) else d1
+        if d2 < d1:
+            errors.append(f"⚠️ Ligne {ligne}: Date fin avant date début")
+            continue
+        h1 = str(r.get("h1")).strip() if pd.notnull(r.get("h1")) else "00:00"
+        h2 = str(r.get("h2")).strip() if pd.notnull(r.get("h2")) else "23:59"
+        if not (len(h1) == 5 and h1[2] == ":"):
+            errors.append(f"⚠️ Ligne {ligne}: Format heure début invalide (attendu HH:MM)")
+            continue
+        if not (len(h2) == 5 and h2[2] == ":"):
+            errors.append(f"⚠️ Ligne {ligne}: Format heure fin invalide (attendu HH:MM)")
+            continue
+        valid.append((r.get("id"), {
+            "app": r["app"], "env": r["env"], "type": r["type"], "d1": d1, "d2": d2, "h1": h1, "h2": h2,
+            "comment": str(r.get("comment")).strip(),
+            "projet": r.get("projet") if pd.notnull(r.get("projet")) and r.get("projet") != "" else None,
+        }))
+    return errors, valid
+
+def random_editor_frame(rnd, n_rows):
+    def pick(*values):
+        return rnd.choice(values)
+    rows = []
+    for i in range(n_rows):
+        d1 = pick(None, date(2026, 3, 1) + timedelta(days=rnd.randint(0, 10)))
+        rows.append({
+            "id": pick(None, float(i + 1)), "app": pick(None, "APP00", "APP01", "APP01", "APP02"),
+            "env": pick(None, "PROD", "RECETTE", "RECETTE"), "type": pick(None, "MEP", "TEST", "TEST"),
+            "projet": pick(None, "", "ALPHA"), "d1": d1,
+            "d2": pick(None, date(2026, 3, 1) + timedelta(days=rnd.randint(0, 10))),
+            "h1": pick(None, "08:00", " 09:30 ", "8h", "8:00", "12:345", "ab:cd"),
+            "h2": pick(None, "18:00", "23:59", "1800"), "comment": pick(None, "", " maj ", "INC-64"),
+        })
+    return pd.DataFrame(rows, columns=["id", "app", "env", "type", "projet", "d1", "d2", "h1", "h2", "comment"])
+
+def same_id(a, b):
+    return (pd.isna(a) and pd.isna(b)) or a == b
+
+def test_validate_events_matches_row_by_row(app):
+    rnd = random.Random(13)
+    for _ in range(100):
+        df = random_editor_frame(rnd, rnd.randint(0, 30))
+        errors, valid = app.validate_events(df)
+        expected_errors, expected_valid = validate_events_rows(df)
+        assert errors == expected_errors
+        assert len(valid) == len(expected_valid)
+        for (event_id, event), (expected_id, expected) in zip(valid, expected_valid):
+            assert same_id(event_id, expected_id)
+            assert event == expected
+
+def test_validate_events_defaults(app):
+    df = pd.DataFrame([{"id": None, "app": "APP00", "env": "PROD", "type": "MEP", "projet": "",
+                        "d1": date(2026, 3, 2), "d2": None, "h1": None, "h2": None, "comment": " ok "}])
+    errors, valid = app.validate_events(df)
+    assert errors == []
+    assert valid[0][1] == {"app": "APP00", "env": "PROD", "type": "MEP", "d1": date(2026, 3, 2), "d2": date(2026, 3, 2),
+                           "h1": "00:00", "h2": "23:59", "comment": "ok", "projet": None}
+
+def test_validate_apps_requires_order(app):
+    df = pd.DataFrame({"id": [1, 2, None, None], "Nom": [" app1 ", "APP2", None, "app3"], "Ordre": [2, None, 5, 1]})
+    errors, valid = app.validate_apps(df)
+    assert errors == ["⚠️ Ligne 2: L'ordre est obligatoire pour 'APP2'"]
+    assert valid["Nom"].tolist() == ["APP1", "APP3"]
+    assert valid["Ordre"].tolist() == [2, 1]